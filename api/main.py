@@ -1,17 +1,61 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException
-from routers import crud, auth, register, login, route_protector, login_history, user_by_email
-from routers_algo import all_user_data, default_chioce, create_task,all_task_data, due_today, dashboard, calendar
+from routers import crud, auth, register, login, route_protector, login_history, login_analytics, user_by_email, internal
+from routers_algo import all_user_data, default_chioce, create_task,all_task_data, due_today, dashboard, calendar, bulk_tasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.openapi.utils import get_openapi
-from routers import crud, auth, register, login, route_protector
-from utils.database import engine, Base
+from utils.database import async_engine, engine
 from utils.deps import AuthUser, get_current_user
+from utils.deadlines import deadline_scheduler
+from utils.events import TASK_DUE_SOON, event_broker
+from utils.login_retention import run_login_compaction
+from utils.login_writer import login_writer
+from utils.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, instrument_engine, metrics, render_pool_waits
+from utils.partitions import run_partition_maintenance
+from utils.profiling import PROFILE_ID_HEADER, ProfilingMiddleware
+from utils.warmup import WarmupState, warm_up
 
-# Initialize the database tables on startup
-Base.metadata.create_all(bind=engine)
+# Tables and indexes are managed by `python -m utils.migrations upgrade`, so importing this
+# module does no database work; the lifespan below warms the pools in the background.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Built once here instead of on the first /docs hit
+    app.openapi()
+
+    # Deadline bucket transitions become reminder events on the user's stream
+    deadline_scheduler.add_listener(
+        lambda bucket, deadline: event_broker.publish(
+            deadline.user_id, TASK_DUE_SOON,
+            {"task_id": deadline.task_id, "title": deadline.title, "due_date": deadline.due_date, "bucket": bucket}
+        )
+    )
+    # Tick the deadline scheduler in the background so reminder transitions fire without polling
+    deadline_task = asyncio.create_task(deadline_scheduler.run())
+    # Creates next months' login_history partitions ahead of the write path
+    partition_task = asyncio.create_task(run_partition_maintenance())
+    # Rolls raw login history past the retention age into per-user daily totals
+    compaction_task = asyncio.create_task(run_login_compaction())
+    # Write-behind buffer for login history
+    login_writer.start()
+    # Pools, lookup tables and the event broker; /ready flips once this finishes
+    app.state.warmup = WarmupState()
+    warmup_task = asyncio.create_task(warm_up(app.state.warmup))
+    try:
+        yield
+    finally:
+        background_tasks = (warmup_task, deadline_task, partition_task, compaction_task)
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await login_writer.stop()
+        await event_broker.stop()
+        await async_engine.dispose()
+        engine.dispose()
 
 # Create FastAPI app instance
-app = FastAPI(title="Task Manager Application")
+app = FastAPI(title="Task Manager Application", lifespan=lifespan)
 
 # CORS configuration
 origins = [
@@ -26,8 +70,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Server-Timing", PROFILE_ID_HEADER],
 )
 
+# Profiles requests on demand; sits inside MetricsMiddleware, which collects the SQL it stores
+app.add_middleware(ProfilingMiddleware)
+# Outermost, so the measured latency includes CORS and every other middleware
+app.add_middleware(MetricsMiddleware)
+# Statement counts and DB time per request, for both the sync and the asyncpg engine
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 # Custom OpenAPI schema with JWT Bearer authentication
 def custom_openapi():
     if app.openapi_schema:
@@ -63,6 +116,19 @@ def root():
 def hello_world():
     return {"message": "Welcome to Task Manager"}
 
+# Readiness probe: 503 until startup warm-up has completed
+@app.get("/ready")
+def ready():
+    if not app.state.warmup.ready:
+        raise HTTPException(status_code=503, detail=app.state.warmup.as_dict())
+    return app.state.warmup.as_dict()
+
+# Prometheus scrape target: request latency, in-flight requests, SQL per route, pool waits
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    content = metrics.render() + render_pool_waits({"sync": engine.pool, "async": async_engine.pool})
+    return PlainTextResponse(content, media_type=PROMETHEUS_CONTENT_TYPE)
+
 # Route for authenticated user info
 @app.get("/user/me", response_model=AuthUser)
 async def read_current_user(current_user: AuthUser = Depends(get_current_user)):
@@ -74,13 +140,10 @@ app.include_router(crud.router)         # Router for CRUD operations (e.g., task
 app.include_router(register.router)     # Router for user registration
 app.include_router(login.router)        # Router for user login
 app.include_router(route_protector.router)  # Router for route protection (if needed)
-#app.include_router(auth.router)
-app.include_router(crud.router)
-app.include_router(register.router)
-app.include_router(login.router)
-app.include_router(route_protector.router)
 app.include_router(login_history.router)
+app.include_router(login_analytics.router)
 app.include_router(user_by_email.router)
+app.include_router(internal.router)
 
 #algo_router
 app.include_router(all_user_data.router)
@@ -89,4 +152,5 @@ app.include_router(create_task.router)
 app.include_router(all_task_data.router)
 app.include_router(due_today.router)
 app.include_router(dashboard.router)
-app.include_router(calendar.router)
\ No newline at end of file
+app.include_router(calendar.router)
+app.include_router(bulk_tasks.router)
\ No newline at end of file
@@ -5,10 +5,11 @@ from pydantic import BaseModel
 from datetime import timedelta,datetime
 from typing import Annotated, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from utils.models import User as UserModel
-from utils.deps import db_dependency, get_current_user, AuthUser
+from utils.deps import async_db_dependency, get_current_user, AuthUser
+from utils.passwords import verify_password
 import os
 from dotenv import load_dotenv
 
@@ -27,9 +28,6 @@ router = APIRouter(
     tags=['auth']
 )
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 Scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
@@ -57,30 +55,38 @@ class UserInDB(User):
         from_attributes = True
 
 # ------------------- Helper Functions ------------------- #
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_user_model(db: AsyncSession, username: str) -> Optional[UserModel]:
+    result = await db.execute(select(UserModel).where(UserModel.username == username))
+    return result.scalars().first()
+
+def to_user_in_db(db_user: UserModel) -> UserInDB:
+    return UserInDB(
+        user_id=db_user.user_id,
+        username=db_user.username,
+        email=db_user.email,
+        password=db_user.password,
+        created_at=db_user.created_at,
+        is_active=db_user.is_active
+    )
 
-def get_user(db: Session, username: str) -> Optional[UserInDB]:
-    db_user = db.query(UserModel).filter(UserModel.username == username).first()
+async def get_user(db: AsyncSession, username: str) -> Optional[UserInDB]:
+    db_user = await get_user_model(db, username)
     if db_user:
-        return UserInDB(
-            user_id=db_user.user_id,
-            username=db_user.username,
-            email=db_user.email,
-            password=db_user.password,
-            created_at=db_user.created_at,
-            is_active=db_user.is_active
-        )
+        return to_user_in_db(db_user)
     return None
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[UserInDB]:
-    user = get_user(db, username)
-    if not user or not verify_password(password, user.password):
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[UserInDB]:
+    db_user = await get_user_model(db, username)
+    if not db_user:
+        return None
+    valid, new_hash = await verify_password(password, db_user.password)
+    if not valid:
         return None
-    return user
+    if new_hash:
+        # Cost factor changed since this hash was made; store the rehashed password
+        db_user.password = new_hash
+        await db.commit()
+    return to_user_in_db(db_user)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     if expires_delta is None:
@@ -95,10 +101,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 # ------------------- Authentication Routes ------------------- #
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
-    db: db_dependency,
+    db: async_db_dependency,
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -1,9 +1,13 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel, EmailStr, validator
+from sqlalchemy import select
 from utils.models import User
-from utils.deps import db_dependency, get_current_user, AuthUser
+from utils.deps import async_db_dependency, get_current_user, AuthUser
+from utils.principal_cache import principal_cache
+from utils.passwords import hash_password
+from utils.deadlines import deadline_scheduler
 from datetime import datetime
-from passlib.context import CryptContext
 from typing import Annotated, Optional
 from routers.login import create_access_token 
 
@@ -88,15 +92,11 @@ class UserUpdateResponse(BaseModel):
         arbitrary_types_allowed = True
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-def hash_password(plain_password: str) -> str:
-    return pwd_context.hash(plain_password)
-
 @router.get("/users/{user_id}",response_model=UserResponse)
-async def get_user(user_id: int, db: db_dependency,current_user: Annotated[AuthUser, Depends(get_current_user)]):
+async def get_user(user_id: int, db: async_db_dependency,current_user: Annotated[AuthUser, Depends(get_current_user)]):
     if user_id != current_user.user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
-    db_user = db.query(User).filter(User.user_id == user_id).first()
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
@@ -105,35 +105,38 @@ async def get_user(user_id: int, db: db_dependency,current_user: Annotated[AuthU
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: db_dependency,
+    db: async_db_dependency,
     current_user: Annotated[AuthUser, Depends(get_current_user)]
 ):
     # Ensure the user can only update their own data
     if user_id != current_user.user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
 
-    db_user = db.query(User).filter(User.user_id == user_id).first()
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
     # Update fields if provided
     if user_update.username:
-        existing_user = db.query(User).filter(User.username == user_update.username).first()
+        result = await db.execute(select(User).where(User.username == user_update.username))
+        existing_user = result.scalars().first()
         if existing_user and existing_user.user_id != user_id:
             raise HTTPException(status_code=400, detail="Username already taken")
         db_user.username = user_update.username
 
     if user_update.email:
-        existing_user = db.query(User).filter(User.email == user_update.email).first()
+        result = await db.execute(select(User).where(User.email == user_update.email))
+        existing_user = result.scalars().first()
         if existing_user and existing_user.user_id != user_id:
             raise HTTPException(status_code=400, detail="Email already registered")
         db_user.email = user_update.email
 
     if user_update.password:
-        db_user.password = hash_password(user_update.password)
+        db_user.password = await hash_password(user_update.password)
 
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    principal_cache.invalidate_user(user_id)
 
     # Generate a new access token after the update
     access_token = create_access_token(data={"sub": db_user.email})
@@ -155,23 +158,27 @@ async def update_user(
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_user(
     user_id: int,
-    db: db_dependency,
+    db: async_db_dependency,
     current_user: Annotated[AuthUser, Depends(get_current_user)]
 ):
     # Ensure the user can only delete their own account
     if user_id != current_user.user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to delete this user")
 
-    db_user = db.query(User).filter(User.user_id == user_id).first()
+    db_user = await db.get(User, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    principal_cache.invalidate_user(user_id)
+    # The scheduler's lock is never taken on the event loop
+    await asyncio.to_thread(deadline_scheduler.forget_user, user_id)
 
     return None  # Return 204 No Content
 
 @router.get("/users", response_model=dict)
-async def check_user_exists(email: EmailStr, db: db_dependency):
-    user = db.query(User).filter(User.email == email).first()
+async def check_user_exists(email: EmailStr, db: async_db_dependency):
+    result = await db.execute(select(User.user_id).where(User.email == email))
+    user = result.first()
     return {"exists": bool(user)}
@@ -0,0 +1,50 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from utils.database import engine, async_engine
+from utils.db_pool import pool_status
+from utils.deps import get_current_admin
+from utils.login_writer import login_writer
+from utils.passwords import hash_pool_status
+from utils.profiling import collapsed_stacks, list_profiles, load_profile, profile_html
+
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    dependencies=[Depends(get_current_admin)]
+)
+
+# Live connection pool state for both engines, used to size DB_POOL_SIZE / DB_MAX_OVERFLOW
+@router.get("/db-pool")
+def get_db_pool_status():
+    return {
+        "sync": pool_status(engine.pool),
+        "async": pool_status(async_engine.pool),
+    }
+
+# Password hashing pool: bcrypt jobs in flight, to size PASSWORD_HASH_WORKERS / _MAX_PENDING
+@router.get("/password-hashing")
+def get_password_hashing_status():
+    return hash_pool_status()
+
+# Login-history write buffer: backlog, write delay, and dropped/requeued/rejected event counts
+@router.get("/login-buffer")
+def get_login_buffer_status():
+    return login_writer.stats()
+
+# Stored request profiles (see utils/profiling.py), newest first
+@router.get("/profiles")
+async def get_profiles(limit: int = Query(50, ge=1, le=500)):
+    return await asyncio.to_thread(list_profiles, limit)
+
+# One profile as JSON, collapsed stacks (flamegraph.pl / speedscope input) or an HTML flame graph
+@router.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = Query("html", pattern="^(html|collapsed|json)$")):
+    profile = await asyncio.to_thread(load_profile, profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile '{profile_id}' not found")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed_stacks(profile))
+    if format == "html":
+        return HTMLResponse(profile_html(profile))
+    return profile
@@ -4,10 +4,12 @@ from pydantic import BaseModel
 from datetime import timedelta, datetime
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from utils.models import User as UserModel, Login_History as LoginHistoryModel  # Import Login_History model
-from utils.deps import db_dependency
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.models import User as UserModel
+from utils.login_writer import login_writer
+from utils.deps import async_db_dependency
+from utils.passwords import verify_password
 import os
 from dotenv import load_dotenv
 
@@ -26,9 +28,6 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 if not SECRET_KEY or not ALGORITHM:
     raise ValueError("Missing AUTH_SECRET_KEY or AUTH_ALGORITHM in environment variables")
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # Pydantic models
 class Token(BaseModel):
     access_token: str
@@ -37,16 +36,21 @@ class Token(BaseModel):
     is_admin: bool
 
 # Helper Functions
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_user_by_email(db: Session, email: str) -> Optional[UserModel]:
-    return db.query(UserModel).filter(UserModel.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]:
+    result = await db.execute(select(UserModel).where(UserModel.email == email))
+    return result.scalars().first()
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[UserModel]:
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.password):
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[UserModel]:
+    user = await get_user_by_email(db, email)
+    if not user:
         return None
+    valid, new_hash = await verify_password(password, user.password)
+    if not valid:
+        return None
+    if new_hash:
+        # Cost factor changed since this hash was made; store the rehashed password
+        user.password = new_hash
+        await db.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -62,10 +66,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 # Updated login_for_access_token to log all date components
 @router.post("/login", response_model=Token)
 async def login_for_access_token(
-    db: db_dependency,
+    db: async_db_dependency,
     form_data: OAuth2PasswordRequestForm = Depends()
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)  # Using form_data.username for email
+    user = await authenticate_user(db, form_data.username, form_data.password)  # Using form_data.username for email
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,21 +77,8 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Current date and time
-    current_time = datetime.utcnow() + timedelta(hours=7)
-    weekday = current_time.isoweekday()  # ISO weekday: Monday=1, Sunday=7
-
-    # Log login history
-    login_history = LoginHistoryModel(
-        user_id=user.user_id,
-        time=current_time.time(),  # Store only time
-        day=current_time.day,
-        month=current_time.month,
-        year=current_time.year,
-        weekday_id=weekday  # Use ISO weekday directly if it matches Weekday table ids
-    )
-    db.add(login_history)
-    db.commit()  # Commit the login history to the database
+    # Log login history (written in the background by the buffered writer)
+    login_writer.record(user.user_id)
 
     # Create access token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
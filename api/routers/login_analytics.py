@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from utils.deps import db_dependency, get_current_admin
+from utils.login_analytics import login_analytics
+from utils.lookups import lookup_dependency
+from utils.task_status import current_time
+from pydantic import BaseModel
+from datetime import date, timedelta
+
+router = APIRouter(
+    prefix='/data',
+    tags=['data']
+)
+
+MAX_RANGE_DAYS = 366
+
+class LoginHeatCell(BaseModel):
+    weekday: str
+    hour: int
+    logins: int
+
+class LoginAnalyticsResponse(BaseModel):
+    start: date
+    end: date
+    dau: int
+    wau: int
+    mau: int
+    distinct_users: int  # Distinct users who logged in between start and end
+    logins: int
+    relative_error: float  # Standard error of the distinct-user estimates
+    heat: List[LoginHeatCell]
+
+# Active users (DAU/WAU/MAU as of `end`) and login heat by weekday and hour, from the per-day
+# HyperLogLog sketches and hourly counters instead of COUNT(DISTINCT) over the raw history
+@router.get("/login-analytics", response_model=LoginAnalyticsResponse, dependencies=[Depends(get_current_admin)])
+def get_login_analytics(
+    db: db_dependency,
+    lookups: lookup_dependency,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+):
+    end = end or current_time().date()
+    start = start or end - timedelta(days=29)
+    if end < start:
+        raise HTTPException(status_code=400, detail="'end' must not be before 'start'")
+    if (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {MAX_RANGE_DAYS} days")
+
+    analytics = login_analytics(db, start, end)
+    heat = [
+        LoginHeatCell(weekday=lookups.weekdays.name_of(weekday) or str(weekday), hour=hour, logins=logins)
+        for (weekday, hour), logins in sorted(analytics.pop("heat").items())
+    ]
+    return LoginAnalyticsResponse(start=start, end=end, heat=heat, **analytics)
@@ -1,95 +1,197 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
-from utils.models import Login_History, Weekday
-from utils.deps import db_dependency
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
+from sqlalchemy import select
+from utils.models import Login_Daily_Rollup, Login_History, User
+from utils.login_retention import rollup_page
+from utils.deps import async_db_dependency, db_dependency
+from utils.login_writer import login_writer
+from utils.lookups import LookupSnapshot, lookup_dependency
+from utils.pagination import (
+    MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, keyset_filter, page_headers
+)
+from utils.serialization import RowsResponse
+from utils.streaming import stream_media_type, stream_rows
+from utils.task_status import LOCAL_TIMEZONE
 from pydantic import BaseModel
 import logging
-from datetime import timedelta, datetime
+from datetime import date, datetime, timedelta
 
 router = APIRouter(
     prefix='/data',
     tags=['data']
 )
 
+ROLLUP_CURSOR_KEY = "rollup_day"
+
 class LoginHistoryResponse(BaseModel):
-    login_id: int
+    login_id: Optional[int] = None  # None for a compacted day
     user_id: int
+    logged_at: datetime
+    # Local (UTC+7) parts of logged_at, kept for existing clients
     time: str  # Use str to directly represent time in HH:MM:SS format
     day: int
     month: int
     year: int
     weekday: str
+    # Raw rows are single logins; past the retention age a row is a whole day's total
+    logins: int = 1
+    rolled_up: bool = False
 
     class Config:
         from_attributes = True
 
-# Endpoint to retrieve all login history records
+# Rows are plain dicts with the fields and order of LoginHistoryResponse
+def login_row_to_dict(record, lookups: LookupSnapshot) -> dict:
+    local = record.logged_at.astimezone(LOCAL_TIMEZONE)
+    return {
+        "login_id": record.login_id,
+        "user_id": record.user_id,
+        "logged_at": record.logged_at,
+        "time": local.strftime("%H:%M:%S"),
+        "day": local.day,
+        "month": local.month,
+        "year": local.year,
+        "weekday": lookups.weekdays.name_of(local.isoweekday()) or local.strftime("%A"),
+        "logins": 1,
+        "rolled_up": False,
+    }
+
+def rollup_row_to_dict(rollup: Login_Daily_Rollup, lookups: LookupSnapshot) -> dict:
+    last = rollup.last_login_at.astimezone(LOCAL_TIMEZONE)
+    return {
+        "login_id": None,
+        "user_id": rollup.user_id,
+        "logged_at": rollup.last_login_at,
+        "time": last.strftime("%H:%M:%S"),
+        "day": rollup.day.day,
+        "month": rollup.day.month,
+        "year": rollup.day.year,
+        "weekday": lookups.weekdays.name_of(rollup.day.isoweekday()) or rollup.day.strftime("%A"),
+        "logins": rollup.logins,
+        "rolled_up": True,
+    }
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Naive query parameters are local time, like the rest of the API
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=LOCAL_TIMEZONE)
+
+# Newest first, after an optional cursor, within an optional [start, end) window. The window
+# bounds logged_at, so Postgres prunes to the partitions (months) it covers.
+def login_history_query(db, user_id: Optional[int], start: Optional[datetime],
+                        end: Optional[datetime], after: Optional[str]):
+    start, end = as_utc(start), as_utc(end)
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="'end' must be after 'start'")
+
+    query = db.query(Login_History.login_id, Login_History.user_id, Login_History.logged_at)
+    if user_id is not None:
+        query = query.filter(Login_History.user_id == user_id)
+    if start:
+        query = query.filter(Login_History.logged_at >= start)
+    if end:
+        query = query.filter(Login_History.logged_at < end)
+    if after:
+        last_value, last_id = decode_cursor(after, "logged_at", True)
+        query = query.filter(keyset_filter(Login_History.logged_at, Login_History.login_id, last_value, last_id, True))
+    return query.order_by(Login_History.logged_at.desc(), Login_History.login_id.desc())
+
+def login_history_page(db, response: Response, user_id: Optional[int], start: Optional[datetime],
+                       end: Optional[datetime], limit: int, after: Optional[str]) -> list:
+    rows = login_history_query(db, user_id, start, end, after).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("logged_at", True, last.logged_at, last.login_id)
+    return rows
+
+# Endpoint to retrieve login history records, newest first
 @router.get("/login-history/", response_model=List[LoginHistoryResponse])
-def get_all_login_history(db: db_dependency):
-    login_history_records = db.query(Login_History).join(Weekday).all()
-    if not login_history_records:
+def get_all_login_history(
+    db: db_dependency,
+    lookups: lookup_dependency,
+    request: Request,
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False,
+):
+    # Exports stream the whole window after the cursor, ignoring `limit`
+    streaming = stream_media_type(request, stream)
+    if streaming:
+        query = login_history_query(db, None, start, end, after)
+        return stream_rows(query.statement, lambda record: login_row_to_dict(record, lookups), streaming)
+
+    login_history_records = login_history_page(db, response, None, start, end, limit, after)
+    if not login_history_records and not after:
         raise HTTPException(status_code=404, detail="No login history records found")
 
-    # Transform results to include weekday name
-    results = [
-        LoginHistoryResponse(
-            login_id=record.login_id,
-            user_id=record.user_id,
-            time=record.time.strftime("%H:%M:%S"),
-            day=record.day,
-            month=record.month,
-            year=record.year,
-            weekday=record.weekday.weekday_name
-        )
-        for record in login_history_records
-    ]
-
-    return results
+    return RowsResponse(
+        [login_row_to_dict(record, lookups) for record in login_history_records],
+        headers=page_headers(response.headers)
+    )
+
+def local_day(value: Optional[datetime]) -> Optional[date]:
+    return value.astimezone(LOCAL_TIMEZONE).date() if value else None
 
+# Recent raw rows first, then the compacted per-day totals older than the retention age.
+# The cursor says which of the two the next page continues in.
 @router.get("/login-history/user/{user_id}", response_model=List[LoginHistoryResponse])
-def get_login_history_by_user(user_id: int, db: db_dependency):
-    login_history_records = db.query(Login_History).join(Weekday).filter(Login_History.user_id == user_id).all()
-    logging.info(f"Records found for user {user_id}: {len(login_history_records)}")
+def get_login_history_by_user(
+    user_id: int,
+    db: db_dependency,
+    lookups: lookup_dependency,
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+):
+    before_day, in_rollups = None, False
+    if after:
+        try:
+            before, _ = decode_cursor(after, ROLLUP_CURSOR_KEY, True)
+            before_day, in_rollups = (before.date() if before else None), True
+        except HTTPException:
+            pass  # A raw-row cursor, decoded by login_history_page
+
+    results = []
+    if not in_rollups:
+        login_history_records = login_history_page(db, response, user_id, start, end, limit, after)
+        results = [login_row_to_dict(record, lookups) for record in login_history_records]
+        if NEXT_CURSOR_HEADER in response.headers:
+            return RowsResponse(results, headers=page_headers(response.headers))
 
-    if not login_history_records:
+    start_day = local_day(as_utc(start))
+    end_day = local_day(as_utc(end) - timedelta(microseconds=1)) if end else None
+    remaining = limit - len(results)
+    # One extra row tells whether another page follows
+    rollups = rollup_page(db, user_id, start_day, end_day, before_day, remaining + 1)
+    if len(rollups) > remaining:
+        rollups = rollups[:remaining]
+        last_day = datetime.combine(rollups[-1].day, datetime.min.time()) if rollups else None
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(ROLLUP_CURSOR_KEY, True, last_day, 0)
+    results.extend(rollup_row_to_dict(rollup, lookups) for rollup in rollups)
+    logging.info(f"Records found for user {user_id}: {len(results)}")
+
+    if not results and not after:
         raise HTTPException(status_code=404, detail="No login history records found for this user")
 
-    results = [
-        LoginHistoryResponse(
-            login_id=record.login_id,
-            user_id=record.user_id,
-            time=record.time.strftime("%H:%M:%S"),
-            day=record.day,
-            month=record.month,
-            year=record.year,
-            weekday=record.weekday.weekday_name
-        )
-        for record in login_history_records
-    ]
-    return results
+    return RowsResponse(results, headers=page_headers(response.headers))
 
 # Pydantic model for request validation
 class LoginHistoryRequest(BaseModel):
     user_id: int
 
 @router.post("/login-history-stamp")
-def log_login_history(request: LoginHistoryRequest, db:db_dependency):
-    # Get the current date and time with timezone adjustment
-    current_time = datetime.utcnow() + timedelta(hours=7)
-    weekday = current_time.isoweekday()  # ISO weekday: Monday=1, Sunday=7
-
-    # Log login history
-    login_history = Login_History(
-        user_id=request.user_id,
-        time=current_time.time(),  # Store only time
-        day=current_time.day,
-        month=current_time.month,
-        year=current_time.year,
-        weekday_id=weekday  # Use ISO weekday directly if it matches Weekday table ids
-    )
-
-    # Add the login history entry to the database
-    db.add(login_history)
-    db.commit()  # Commit the login history to the database
+async def log_login_history(request: LoginHistoryRequest, db: async_db_dependency):
+    # An unknown user would only fail later, inside the writer's batch
+    if await db.scalar(select(User.user_id).where(User.user_id == request.user_id)) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Queued for the buffered writer; the row itself is written in the background
+    login_writer.record(request.user_id)
 
-    return {"message": "Login history logged successfully"}
\ No newline at end of file
+    return {"message": "Login history logged successfully"}
@@ -1,11 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, EmailStr, validator
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from utils.models import User
-from utils.database import engine, Base
-from utils.deps import db_dependency
+from utils.deps import async_db_dependency
+from utils.passwords import hash_password
 from datetime import datetime
-from passlib.context import CryptContext
 from typing import Annotated
 
 router = APIRouter(
@@ -13,8 +12,6 @@ router = APIRouter(
     tags=['auth']
 )
 
-Base.metadata.create_all(bind=engine)
-
 class UserCreate(BaseModel):
     username: str
     password: str
@@ -50,23 +47,19 @@ class UserResponse(BaseModel):
     class Config:
         from_attributes = True
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-def hash_password(plain_password: str) -> str:
-    return pwd_context.hash(plain_password)
-
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate, db: db_dependency):
-    existing_user = db.query(User).filter(
+async def register_user(user: UserCreate, db: async_db_dependency):
+    result = await db.execute(select(User).where(
         (User.username == user.username) | (User.email == user.email)
-    ).first()
+    ))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(
             status_code=400,
             detail="Username or email already registered"
         )
 
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -74,7 +67,7 @@ async def register_user(user: UserCreate, db: db_dependency):
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
 
     return db_user
\ No newline at end of file
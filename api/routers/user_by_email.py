@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from pydantic import BaseModel
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
 from jose import jwt
 import os
 from utils.models import User as UserModel
-from utils.deps import db_dependency
+from utils.deps import async_db_dependency
 from dotenv import load_dotenv
 
 router = APIRouter(
@@ -31,8 +32,9 @@ class UserInfoResponse(BaseModel):
     access_token: str  # Add token to the response
 
 # Function to get user by email
-def get_user_by_email(db: db_dependency, email: str) -> Optional[UserModel]:
-    return db.query(UserModel).filter(UserModel.email == email).first()
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[UserModel]:
+    result = await db.execute(select(UserModel).where(UserModel.email == email))
+    return result.scalars().first()
 
 # Function to create JWT token
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -46,9 +48,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 # New route to receive email as a query parameter and return user_id, is_admin, and token
 @router.get("/get-user-info/{email}", response_model=UserInfoResponse)  # GET request for query param
-async def get_user_info(email: str, db: db_dependency):
+async def get_user_info(email: str, db: async_db_dependency):
     # Check if the user exists in the database by email
-    user = get_user_by_email(db, email)
+    user = await get_user_by_email(db, email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -1,10 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
-from sqlalchemy.orm import Session
+from typing import Annotated, List, Optional
 from utils.models import Task, Status, Category, Priority  # Import the Priority model
-from utils.deps import db_dependency
-from datetime import datetime,timedelta
+from utils.deps import AuthUser, db_dependency, get_current_admin, get_current_user
+from utils.lookups import LookupSnapshot, lookup_dependency
+from utils.pagination import (
+    MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER,
+    decode_cursor, encode_cursor, escape_like, keyset_filter, keyset_order
+)
+from utils.task_search import search_tasks
+from utils.streaming import stream_media_type, stream_rows
+from utils.data_version import VersionedRead, bump_user_version, lookups_key
+from utils.deadlines import deadline_scheduler
+from utils.events import TASK_STATUS_CHANGED, event_broker, sse_stream
+from utils.task_status import (
+    current_time, effective_status_id, plan_abandon, plan_complete, sweep_delayed_tasks
+)
+from datetime import datetime
 
 router = APIRouter(
     prefix='/algo',
@@ -29,243 +42,248 @@ class TaskResponse(BaseModel):
         from_attribute = True
 
 
-# Generic selection sort function based on sorting key
-def selection_sort(tasks_dict, sort_key):
-    n = len(tasks_dict)
-    for i in range(n):
-        min_index = i
-        for j in range(i + 1, n):
-            if tasks_dict[j][sort_key] < tasks_dict[min_index][sort_key]:
-                min_index = j
-        tasks_dict[i], tasks_dict[min_index] = tasks_dict[min_index], tasks_dict[i]
-    return tasks_dict
-
-# Merge Sort for sorting by due_date
-def merge_sort_due_date(tasks):
-    if len(tasks) <= 1:
-        return tasks
-
-    mid = len(tasks) // 2
-    left = merge_sort_due_date(tasks[:mid])
-    right = merge_sort_due_date(tasks[mid:])
-
-    return merge(left, right)
-
-def merge(left, right):
-    sorted_list = []
-    while left and right:
-        if left[0]['due_date'] <= right[0]['due_date']:
-            sorted_list.append(left.pop(0))
-        else:
-            sorted_list.append(right.pop(0))
-
-    return sorted_list + left + right
-
-# Linear search algorithm to find tasks by title
-def search_by_title(tasks_dict, title):
-    matched_tasks = []
-    for task in tasks_dict:
-        if title.lower() in task['title'].lower():
-            matched_tasks.append(task)
-    return matched_tasks
-
-# Linear search to find status by status_id
-def find_status_name(statuses, status_id):
-    for status in statuses:
-        if status.status_id == status_id:
-            return status.name
-    return "Unknown"  # In case status_id doesn't match any status
-
-# Linear search to find category by category_id
-def find_category_name(categories, category_id):
-    for category in categories:
-        if category.category_id == category_id:
-            return category.name
-    return "Unknown"  # In case category_id doesn't match any category
-
-# Linear search to find priority by priority_id
-def find_priority_name(priorities, priority_id):
-    for priority in priorities:
-        if priority.priority_id == priority_id:
-            return priority.name
-    return "Unknown"  # In case priority_id doesn't match any priority
-
-# Helper function to find a status by name using linear search
-def find_status_by_name(statuses, name):
-    for status in statuses:
-        if status.name == name:
-            return status
-    return None  # Return None if not found
+# Sort keys accepted by /get-all-tasks, mapped to the column the database orders by
+SORT_COLUMNS = {
+    "task_id": Task.task_id,
+    "user_id": Task.user_id,
+    "title": Task.title,
+    "description": Task.description,
+    "created_at": Task.created_at,
+    "create_date": Task.created_at,
+    "due_date": Task.due_date,
+    "finished_date": Task.finished_date,
+    "is_important": Task.is_important,
+    "category": Category.name,
+    "priority": Priority.name,
+    "status": Status.name,
+}
+
+# Columns a list row is built from; tasks are read as plain rows, never hydrated as ORM objects
+TASK_ROW_COLUMNS = (
+    Task.task_id, Task.user_id, Task.title, Task.description, Task.created_at, Task.due_date,
+    Task.is_important, Task.finished_date, Task.category_id, Task.priority_id
+)
+
+def task_row_to_dict(row, lookups: LookupSnapshot) -> dict:
+    # Same fields and order as TaskResponse, without validating values read from the database
+    return {
+        "task_id": row.task_id,
+        "user_id": row.user_id,
+        "title": row.title,
+        "description": row.description,
+        "created_at": row.created_at,
+        "due_date": row.due_date,
+        "is_important": row.is_important,
+        "finished_date": row.finished_date,
+        "category": lookups.categories.name_of(row.category_id),
+        "priority": lookups.priorities.name_of(row.priority_id),
+        "status": lookups.statuses.name_of(row.effective_status_id),
+    }
+
+def to_task_response(task: Task, lookups: LookupSnapshot, status_id: Optional[int] = None) -> TaskResponse:
+    # Lookup names come from the cached tables instead of lazy-loading each relationship
+    return TaskResponse(
+        task_id=task.task_id,
+        user_id=task.user_id,
+        title=task.title,
+        description=task.description,
+        created_at=task.created_at,
+        due_date=task.due_date,
+        is_important=task.is_important,
+        finished_date=task.finished_date,
+        category=lookups.categories.name_of(task.category_id),
+        priority=lookups.priorities.name_of(task.priority_id),
+        status=lookups.statuses.name_of(task.status_id if status_id is None else status_id)
+    )
 
 
 @router.get("/get-all-tasks", response_model=List[TaskResponse])
 def get_tasks(
     db: db_dependency,
+    lookups: lookup_dependency,
+    request: Request,
+    response: Response,
     user_id: int,
     sorting_status: str = "task_id", 
     reverse_status: bool = False, 
     title: Optional[str] = None,  
     category: Optional[str] = None,  
     status: Optional[str] = None,  
-    priority: Optional[str] = None  
+    priority: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False
 ):
-    # Fetch tasks, statuses, categories, and priorities from the database
-    tasks = db.query(Task).filter(Task.user_id == user_id).all()
-    statuses = db.query(Status).all()
-    categories = db.query(Category).all()
-    priorities = db.query(Priority).all()
-
-    # Linear search for 'Delayed' and 'Ongoing' statuses
-    delay_status = find_status_by_name(statuses, "Delayed")
-    ongoing_status = find_status_by_name(statuses, "Ongoing")
-
-    tasks_dict = [task.__dict__ for task in tasks]
-    
-    for task in tasks_dict:
-        # Adjust time with +7 hours
-        current_time_with_offset = datetime.utcnow() + timedelta(hours=7)
-
-        # Convert 'created_at' to string
-        if 'created_at' in task:
-            task['create_date'] = task['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-
-        # Check if due date has passed and update to 'Delayed' if in 'Ongoing' status
-        if task['due_date'] and task['due_date'] < current_time_with_offset and task['status_id'] == ongoing_status.status_id:
-            task_in_db = db.query(Task).filter(Task.task_id == task['task_id']).first()
-            task_in_db.status_id = delay_status.status_id
-            db.commit()  # Commit the change
-            db.refresh(task_in_db)
-            task['status_id'] = delay_status.status_id
-
-        task['status'] = find_status_name(statuses, task['status_id'])
-        task.pop('status_id', None)  # Remove 'status_id' after converting
-
-        task['category'] = find_category_name(categories, task['category_id'])
-        task.pop('category_id', None)
-
-        task['priority'] = find_priority_name(priorities, task['priority_id'])
-        task.pop('priority_id', None)
+    sort_column = SORT_COLUMNS.get(sorting_status)
+    if sort_column is None:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sorting_status}'")
+
+    # Exports stream every matching row after the cursor, ignoring `limit`, and are not cached
+    streaming = stream_media_type(request, stream)
+    if not streaming:
+        # Unchanged data since the client's copy (304), or a body this worker already built
+        read = VersionedRead(request, db, user_id, extra=lookups_key(lookups))
+        cached = read.cached()
+        if cached is not None:
+            return cached
+
+    delay_status = lookups.statuses.find("Delayed")
+    ongoing_status = lookups.statuses.find("Ongoing")
+    if not delay_status or not ongoing_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
 
-    if title:
-        tasks_dict = search_by_title(tasks_dict, title)
+    # 'Delayed' is derived inside the SELECT, so listing tasks never writes
+    status_id = effective_status_id(ongoing_status.status_id, delay_status.status_id)
+    query = db.query(*TASK_ROW_COLUMNS, status_id.label("effective_status_id")).filter(Task.user_id == user_id)
 
+    # Name filters resolve to ids through the cached lookup tables
+    no_match = HTTPException(status_code=404, detail="No tasks match the given filters")
+    if title:
+        query = query.filter(Task.title.ilike(f"%{escape_like(title)}%", escape="\\"))
     if category:
-        tasks_dict = [task for task in tasks_dict if task['category'].lower() == category.lower()]
-
+        category_row = lookups.categories.find(category)
+        if not category_row:
+            raise no_match
+        query = query.filter(Task.category_id == category_row.category_id)
     if status:
-        tasks_dict = [task for task in tasks_dict if task['status'].lower() == status.lower()]
-
+        status_row = lookups.statuses.find(status)
+        if not status_row:
+            raise no_match
+        query = query.filter(status_id == status_row.status_id)
     if priority:
-        tasks_dict = [task for task in tasks_dict if task['priority'].lower() == priority.lower()]
+        priority_row = lookups.priorities.find(priority)
+        if not priority_row:
+            raise no_match
+        query = query.filter(Task.priority_id == priority_row.priority_id)
+
+    if not streaming:
+        total = query.count()
+        if total == 0:
+            raise no_match
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+
+    # Sorting by a lookup name needs the matching join
+    if sorting_status == "category":
+        query = query.outerjoin(Task.category)
+    elif sorting_status == "priority":
+        query = query.join(Task.priority)
+    elif sorting_status == "status":
+        query = query.join(Status, Status.status_id == status_id)
+
+    if after:
+        last_value, last_id = decode_cursor(after, sorting_status, reverse_status)
+        query = query.filter(keyset_filter(sort_column, Task.task_id, last_value, last_id, reverse_status))
+
+    query = (
+        query.add_columns(sort_column.label("sort_value"))
+        .order_by(*keyset_order(sort_column, Task.task_id, reverse_status))
+    )
 
-    if not tasks_dict:
-        raise HTTPException(status_code=404, detail="No tasks match the given filters")
+    if streaming:
+        return stream_rows(query.statement, lambda row: task_row_to_dict(row, lookups), streaming)
 
-    if sorting_status == "due_date":
-        tasks_dict = merge_sort_due_date(tasks_dict)
-    else:
-        tasks_dict = selection_sort(tasks_dict, sorting_status)
+    if limit is None:
+        return read.respond([task_row_to_dict(row, lookups) for row in query.all()], response.headers)
 
-    if reverse_status:
-        tasks_dict.reverse()
+    # Fetch one extra row to know whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            sorting_status, reverse_status, last.sort_value, last.task_id
+        )
+
+    return read.respond([task_row_to_dict(row, lookups) for row in rows], response.headers)
 
-    return tasks_dict
+
+class TaskSearchResult(TaskResponse):
+    score: float
+
+
+# Relevance-ranked, prefix and typo tolerant search over title and description
+@router.get("/tasks/search", response_model=List[TaskSearchResult])
+def search_user_tasks(
+    db: db_dependency,
+    lookups: lookup_dependency,
+    user_id: int,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    hits = search_tasks(db, user_id, q, limit, offset)
+    return [
+        TaskSearchResult(**to_task_response(task, lookups).model_dump(), score=score)
+        for task, score in hits
+    ]
+
+
+# ------------------- Task events ------------------- #
+def publish_status_change(task_response: TaskResponse) -> TaskResponse:
+    event_broker.publish(task_response.user_id, TASK_STATUS_CHANGED, task_response.model_dump())
+    return task_response
+
+# Server-Sent Events stream of the caller's task changes, so pages apply deltas instead of refetching.
+# Only admins may follow another user's stream with user_id.
+@router.get("/tasks/events")
+async def stream_task_events(
+    request: Request,
+    current_user: Annotated[AuthUser, Depends(get_current_user)],
+    user_id: Optional[int] = None
+):
+    if user_id is not None and user_id != current_user.user_id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to follow this user's tasks")
+    subscription = event_broker.subscribe(current_user.user_id if user_id is None else user_id)
+    return StreamingResponse(
+        sse_stream(subscription, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @router.put("/complete-task/{task_id}", response_model=TaskResponse)
-def complete_task(task_id: int, db: db_dependency):
+def complete_task(task_id: int, db: db_dependency, lookups: lookup_dependency):
     task = db.query(Task).filter(Task.task_id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Linear search for statuses
-    statuses = db.query(Status).all()
-    completed_status = find_status_by_name(statuses, "Completed")
-    delayed_status = find_status_by_name(statuses, "Delayed")
-    late_status = find_status_by_name(statuses, "Late")
-    abandoned_status = find_status_by_name(statuses, "Abandoned")
-
-    if not completed_status or not delayed_status or not late_status or not abandoned_status:
-        raise HTTPException(status_code=404, detail="Required statuses not found")
-
-    if task.status_id == abandoned_status.status_id or task.status_id == late_status.status_id:
-        raise HTTPException(status_code=400, detail="Task with status 'Abandoned' cannot be completed")
-
-    if task.status_id == delayed_status.status_id:
-        task.status_id = late_status.status_id
-        db.commit()  # Commit the change to 'Late'
-        db.refresh(task)
-
-        return TaskResponse(
-            task_id=task.task_id,
-            user_id=task.user_id,
-            title=task.title,
-            description=task.description,
-            created_at=task.created_at,
-            due_date=task.due_date,
-            is_important=task.is_important,
-            finished_date=task.finished_date,
-            category=task.category.name if task.category else None,
-            priority=task.priority.name if task.priority else None,
-            status=task.status.name
-        )
-
-    task.status_id = completed_status.status_id
-    task.finished_date = datetime.utcnow() + timedelta(hours=7)  # Adjust time with +7 hours
+    # 'Completed', or 'Late' when the task is past its due date
+    target_status = plan_complete(task, lookups.statuses)
+    task.status_id = target_status.status_id
+    if target_status.name == "Completed":
+        task.finished_date = current_time()  # Adjust time with +7 hours
 
+    bump_user_version(db, task.user_id)
     db.commit()
     db.refresh(task)
+    deadline_scheduler.untrack(task.user_id, task.task_id)
 
-    return TaskResponse(
-        task_id=task.task_id,
-        user_id=task.user_id,
-        title=task.title,
-        description=task.description,
-        created_at=task.created_at,
-        due_date=task.due_date,
-        is_important=task.is_important,
-        finished_date=task.finished_date,
-        category=task.category.name if task.category else None,
-        priority=task.priority.name if task.priority else None,
-        status=task.status.name
-    )
+    return publish_status_change(to_task_response(task, lookups))
 
 
 @router.put("/abandon-task/{task_id}", response_model=TaskResponse)
-def abandon_task(task_id: int, db: db_dependency):
+def abandon_task(task_id: int, db: db_dependency, lookups: lookup_dependency):
     task = db.query(Task).filter(Task.task_id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Linear search for statuses
-    statuses = db.query(Status).all()
-    abandoned_status = find_status_by_name(statuses, "Abandoned")
-    late_status = find_status_by_name(statuses, "Late")
-    completed_status = find_status_by_name(statuses, "Completed")
-
-    if not abandoned_status or not late_status or not completed_status:
-        raise HTTPException(status_code=404, detail="Required statuses not found")
-
-    if task.status_id == late_status.status_id or task.status_id == completed_status.status_id:
-        raise HTTPException(status_code=400, detail="Task cannot be abandoned because it is 'Late' or 'Completed'")
-    
-    if task.status_id == abandoned_status.status_id:
-        raise HTTPException(status_code=400, detail="Task already 'Abandoned'")
-    
-    task.status_id = abandoned_status.status_id
+    task.status_id = plan_abandon(task, lookups.statuses).status_id
+    bump_user_version(db, task.user_id)
     db.commit()
     db.refresh(task)
+    deadline_scheduler.untrack(task.user_id, task.task_id)
 
-    return TaskResponse(
-        task_id=task.task_id,
-        user_id=task.user_id,
-        title=task.title,
-        description=task.description,
-        created_at=task.created_at,
-        due_date=task.due_date,
-        is_important=task.is_important,
-        finished_date=task.finished_date,
-        category=task.category.name if task.category else None,
-        priority=task.priority.name if task.priority else None,
-        status=task.status.name
-    )
+    return publish_status_change(to_task_response(task, lookups))
+
+
+# Persist 'Delayed' for every overdue 'Ongoing' task with one set-based UPDATE (admin only: it
+# writes every user's tasks)
+@router.put("/sweep-delayed-tasks", dependencies=[Depends(get_current_admin)])
+def sweep_delayed(db: db_dependency, lookups: lookup_dependency):
+    delayed_status = lookups.statuses.find("Delayed")
+    ongoing_status = lookups.statuses.find("Ongoing")
+    if not delayed_status or not ongoing_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
+
+    updated = sweep_delayed_tasks(db, ongoing_status.status_id, delayed_status.status_id)
+    return {"updated": updated}
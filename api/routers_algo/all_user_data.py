@@ -1,9 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
-from utils.models import User
+from sqlalchemy import delete, func, select
+from utils.models import Login_History, Task, TaskTag, User
 from utils.deps import db_dependency
-from datetime import datetime
+from utils.pagination import (
+    MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER,
+    decode_cursor, encode_cursor, page_headers, row_keyset_filter, row_keyset_order
+)
+from utils.serialization import RowsResponse
+from utils.streaming import stream_media_type, stream_rows
+from utils.principal_cache import principal_cache
+from utils.deadlines import deadline_scheduler
+from utils.task_search import invalidate_task_search
 
 # Import your models and create database session
 router = APIRouter(
@@ -23,103 +32,96 @@ class UserResponse(BaseModel):
     class Config:
         from_attribute = True
 
-# Generic selection sort function based on sorting key
-def selection_sort(users_dict, sort_key):
-    n = len(users_dict)
-    for i in range(n):
-        min_index = i
-        for j in range(i + 1, n):
-            if users_dict[j][sort_key] < users_dict[min_index][sort_key]:
-                min_index = j
-        users_dict[i], users_dict[min_index] = users_dict[min_index], users_dict[i]
-    return users_dict
-
-# Linear search algorithm to find a user by username
-def search_by_username(users_dict, username):
-    for user in users_dict:
-        if user['username'].lower() == username.lower():
-            return user
-    return None
-
-# Route to get all users, sort them, search by username, or return sorted users
+# Whitelisted sort keys; each is NOT NULL and backed by a (column, user_id) index
+SORT_COLUMNS = {
+    "user_id": User.user_id,
+    "username": User.username,
+    "create_date": User.created_at,
+    "is_admin": User.is_admin,
+}
+
+def user_row_to_dict(row) -> dict:
+    # Same fields and order as UserResponse, built straight from the selected columns
+    return {
+        "user_id": row.user_id,
+        "username": row.username,
+        "email": row.email,
+        "is_active": row.is_active,
+        "is_admin": row.is_admin,
+        "create_date": row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+# Route to list users a page at a time, sorted in SQL, or to look one up by username
 @router.get("/all_users", response_model=List[UserResponse])
 def get_users(
-    db: db_dependency, 
-    sorting_status: str = "user_id", 
-    reverse_status: bool = False, 
-    username: Optional[str] = None  # Optional parameter for searching by username
+    db: db_dependency,
+    request: Request,
+    response: Response,
+    sorting_status: str = "user_id",
+    reverse_status: bool = False,
+    username: Optional[str] = None,  # Optional parameter for searching by username
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    stream: bool = False
 ):
-    users = db.query(User).all()
-    users_dict = [user.__dict__ for user in users]
-    
-    # Remove SQLAlchemy session-specific keys, such as '_sa_instance_state'
-    for user in users_dict:
-        user.pop('_sa_instance_state', None)
-
-        # Convert 'created_at' (datetime) to 'create_date' (string)
-        if 'created_at' in user:
-            user['create_date'] = user['created_at'].strftime('%Y-%m-%d %H:%M:%S')
-            user.pop('created_at', None)  # Remove 'created_at' after converting
-
-    # If searching by username, perform the search and return the result
+    sort_column = SORT_COLUMNS.get(sorting_status)
+    if sort_column is None:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by '{sorting_status}'")
+
+    # Only the listed columns are read; the password hash never leaves the database
+    query = db.query(User.user_id, User.username, User.email, User.is_active, User.is_admin, User.created_at)
+
+    # Case-insensitive match served by the lower(username) index
     if username:
-        found_user = search_by_username(users_dict, username)
+        found_user = query.filter(func.lower(User.username) == username.lower()).first()
         if found_user:
-            return [found_user]  # Return the matched user
+            return RowsResponse([user_row_to_dict(found_user)])  # Return the matched user
         raise HTTPException(status_code=404, detail=f"User with username '{username}' not found")
 
-    # Determine sort key based on sorting_status input
-    sort_key = "user_id"  # Default sort by user_id
-    if sorting_status == "username":
-        sort_key = "username"
-    elif sorting_status == "create_date":
-        sort_key = "create_date"
-    elif sorting_status == "is_admin":
-        sort_key = "is_admin"
-
-    # Sort users by the chosen key
-    users_dict = selection_sort(users_dict, sort_key)
-
-    # Reverse the list if reverse_status is True
-    if reverse_status:
-        users_dict.reverse()
-
-    # If id is 0 or no match is found, return all sorted users
-    return users_dict
+    # Exports stream every user after the cursor in the same order, ignoring `limit`
+    streaming = stream_media_type(request, stream)
+    if after:
+        last_value, last_id = decode_cursor(after, sorting_status, reverse_status)
+        query = query.filter(row_keyset_filter(sort_column, User.user_id, last_value, last_id, reverse_status))
+    elif not streaming:
+        response.headers[TOTAL_COUNT_HEADER] = str(db.query(func.count(User.user_id)).scalar())
+
+    query = query.order_by(*row_keyset_order(sort_column, User.user_id, reverse_status))
+    if streaming:
+        return stream_rows(query.statement, user_row_to_dict, streaming)
+
+    # Fetch one extra row to know whether another page follows
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            sorting_status, reverse_status, getattr(last, sort_column.key), last.user_id
+        )
+
+    return RowsResponse([user_row_to_dict(row) for row in rows], headers=page_headers(response.headers))
 
 #----------------- Delete ------------------------#
 
-# Linear search function to find a user by user_id
-def search_by_user_id(users_dict, user_id):
-    for user in users_dict:
-        if user['user_id'] == user_id:
-            return user
-    return None
-
-# Delete user endpoint using linear search
+# Delete user endpoint: one primary-key lookup, then set-based deletes of the user's rows
 @router.delete("/delete_user/{user_id}")
 def delete_user(user_id: int, db: db_dependency):
-    # Fetch all users from the database
-    users = db.query(User).all()
-    users_dict = [user.__dict__ for user in users]
-
-    # Remove SQLAlchemy session-specific keys, such as '_sa_instance_state'
-    """  for user in users_dict:
-            user.pop('_sa_instance_state', None)"""
+    exists = db.execute(select(User.user_id).where(User.user_id == user_id)).first()
 
-    # Use linear search to find the user by user_id
-    found_user = search_by_user_id(users_dict, user_id)
-
-    if not found_user:
+    if not exists:
         # Raise an error if the user does not exist
         raise HTTPException(status_code=404, detail=f"User with user_id '{user_id}' not found")
 
-    # Fetch the actual user object using user_id to delete it from the database
-    user_to_delete = db.query(User).filter(User.user_id == user_id).first()
-
-    if user_to_delete:
-        db.delete(user_to_delete)  # Delete the user (Need fix CASCADE)
-        db.commit()  # Commit the transaction
+    # Children first, without loading them into the session (login rollups cascade in the database)
+    user_tasks = select(Task.task_id).where(Task.user_id == user_id)
+    db.execute(delete(TaskTag).where(TaskTag.task_id.in_(user_tasks)))
+    db.execute(delete(Task).where(Task.user_id == user_id))
+    db.execute(delete(Login_History).where(Login_History.user_id == user_id))
+    db.execute(delete(User).where(User.user_id == user_id))
+    db.commit()  # Commit the transaction
+    principal_cache.invalidate_user(user_id)
+    deadline_scheduler.forget_user(user_id)
+    invalidate_task_search(user_id)
 
     # Return a success message
-    return {"message": f"User with user_id '{user_id}' has been deleted successfully"}
\ No newline at end of file
+    return {"message": f"User with user_id '{user_id}' has been deleted successfully"}
@@ -0,0 +1,233 @@
+import io
+from collections import defaultdict
+from datetime import datetime
+from typing import Annotated, Dict, List, Literal, Optional, Set
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from routers_algo.create_task import TaskCreate, has_valid_lookups, task_values
+from utils.data_version import bump_user_versions
+from utils.deadlines import TaskDeadline, deadline_scheduler
+from utils.deps import AuthUser, db_dependency, get_current_user
+from utils.events import TASKS_CREATED, TASKS_STATUS_CHANGED, event_broker
+from utils.lookups import lookup_dependency
+from utils.models import Task, User
+from utils.task_status import current_time, plan_abandon, plan_complete
+
+router = APIRouter(
+    prefix='/algo',
+    tags=['algo']
+)
+
+BULK_MAX_ITEMS = 10000
+TITLE_MAX_LENGTH = Task.__table__.c.title.type.length
+# Batches at least this large are loaded with COPY on Postgres instead of a multi-row INSERT
+BULK_COPY_THRESHOLD = 1000
+
+# Columns written by COPY, in order
+COPY_COLUMNS = [
+    "task_id", "user_id", "title", "description", "created_at", "due_date",
+    "is_important", "category_id", "priority_id", "status_id",
+]
+
+
+class BulkTaskCreate(BaseModel):
+    tasks: List[TaskCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class BulkStatusUpdate(BaseModel):
+    task_ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+    action: Literal["complete", "abandon"]
+    user_id: Optional[int] = None  # Admins only: restrict to this user; others are scoped to themselves
+
+class BulkItemResult(BaseModel):
+    index: int
+    ok: bool
+    task_id: Optional[int] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkResponse(BaseModel):
+    succeeded: int
+    failed: int
+    results: List[BulkItemResult]
+
+
+def bulk_response(results: List[BulkItemResult]) -> BulkResponse:
+    succeeded = sum(1 for result in results if result.ok)
+    return BulkResponse(succeeded=succeeded, failed=len(results) - succeeded, results=results)
+
+
+# ------------------- Bulk insert ------------------- #
+def insert_tasks(db: Session, rows: List[dict]) -> List[int]:
+    # One batched multi-row INSERT ... RETURNING, ids in the same order as rows
+    return db.scalars(insert(Task).returning(Task.task_id, sort_by_parameter_order=True), rows).all()
+
+def _copy_value(value) -> str:
+    if value is None:
+        return r"\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, int):
+        return str(value)
+    # Quoted CSV values are never read as NULL, so a literal '\N' title stays text
+    return '"' + str(value).replace('"', '""') + '"'
+
+def copy_tasks(db: Session, rows: List[dict]) -> List[int]:
+    # COPY cannot return ids, so they are reserved from the sequence up front
+    task_ids = db.execute(
+        text("SELECT nextval(pg_get_serial_sequence('tasks', 'task_id')) FROM generate_series(1, :n)"),
+        {"n": len(rows)}
+    ).scalars().all()
+
+    created_at = datetime.utcnow()
+    buffer = io.StringIO()
+    for task_id, row in zip(task_ids, rows):
+        values = {**row, "task_id": task_id, "created_at": created_at}
+        buffer.write(",".join(_copy_value(values[column]) for column in COPY_COLUMNS) + "\n")
+    buffer.seek(0)
+
+    # Raw DBAPI cursor on the session's connection, so COPY joins the same transaction
+    dbapi_connection = db.connection().connection
+    with dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY tasks ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            buffer
+        )
+    return task_ids
+
+
+def item_error(task: TaskCreate, lookups, known_users: Set[int], current_user: AuthUser) -> Optional[str]:
+    # Everything the database would reject, so one bad item cannot fail the whole INSERT/COPY
+    if task.user_id != current_user.user_id and not current_user.is_admin:
+        return "Cannot create tasks for another user"
+    if task.user_id not in known_users:
+        return "User not found"
+    if len(task.title) > TITLE_MAX_LENGTH:
+        return f"Title longer than {TITLE_MAX_LENGTH} characters"
+    if not has_valid_lookups(task, lookups):
+        return "Invalid category, priority, or status"
+    return None
+
+@router.post("/tasks/bulk", response_model=BulkResponse)
+def create_tasks_bulk(
+    payload: BulkTaskCreate,
+    db: db_dependency,
+    lookups: lookup_dependency,
+    current_user: Annotated[AuthUser, Depends(get_current_user)]
+):
+    results: List[Optional[BulkItemResult]] = [None] * len(payload.tasks)
+    rows, positions = [], []
+
+    # Callers create their own tasks, admins anyone's. The batch's users are resolved in one
+    # query; the rest is checked in memory against the cached lookup tables
+    user_ids = {task.user_id for task in payload.tasks}
+    known_users = set(db.scalars(select(User.user_id).where(User.user_id.in_(user_ids))))
+    for index, task in enumerate(payload.tasks):
+        error = item_error(task, lookups, known_users, current_user)
+        if error:
+            results[index] = BulkItemResult(index=index, ok=False, error=error)
+            continue
+        rows.append(task_values(task))
+        positions.append(index)
+
+    if rows:
+        if db.get_bind().dialect.name == "postgresql" and len(rows) >= BULK_COPY_THRESHOLD:
+            task_ids = copy_tasks(db, rows)
+        else:
+            task_ids = insert_tasks(db, rows)
+        bump_user_versions(db, (row["user_id"] for row in rows))
+        db.commit()
+
+        ongoing_status = lookups.statuses.find("Ongoing")
+        created_by_user: Dict[int, List[int]] = defaultdict(list)
+        for index, task_id, row in zip(positions, task_ids, rows):
+            results[index] = BulkItemResult(
+                index=index, ok=True, task_id=task_id, status=lookups.statuses.name_of(row["status_id"])
+            )
+            created_by_user[row["user_id"]].append(task_id)
+            if ongoing_status and row["status_id"] == ongoing_status.status_id:
+                deadline_scheduler.track(TaskDeadline(
+                    task_id, row["user_id"], row["title"], row["description"], row["due_date"]
+                ))
+
+        # One event per user rather than one per task keeps subscriber queues small
+        for user_id, created_ids in created_by_user.items():
+            event_broker.publish(user_id, TASKS_CREATED, {"task_ids": created_ids})
+
+    return bulk_response(results)
+
+
+# ------------------- Bulk status transitions ------------------- #
+@router.put("/tasks/bulk-status", response_model=BulkResponse)
+def update_task_status_bulk(
+    payload: BulkStatusUpdate,
+    db: db_dependency,
+    lookups: lookup_dependency,
+    current_user: Annotated[AuthUser, Depends(get_current_user)]
+):
+    # Callers change their own tasks; only admins may name another user or leave it open
+    user_id = payload.user_id
+    if not current_user.is_admin:
+        if user_id is not None and user_id != current_user.user_id:
+            raise HTTPException(status_code=403, detail="Cannot change another user's tasks")
+        user_id = current_user.user_id
+
+    # Lock every requested row once; transitions are planned in memory
+    query = (
+        db.query(Task.task_id, Task.user_id, Task.status_id, Task.due_date)
+        .filter(Task.task_id.in_(set(payload.task_ids)))
+    )
+    if user_id is not None:
+        query = query.filter(Task.user_id == user_id)
+    tasks = {row.task_id: row for row in query.with_for_update().all()}
+
+    now = current_time()
+    results: List[BulkItemResult] = []
+    targets: Dict[int, List[int]] = defaultdict(list)
+    seen = set()
+    for index, task_id in enumerate(payload.task_ids):
+        task = tasks.get(task_id)
+        if task_id in seen:
+            results.append(BulkItemResult(index=index, ok=False, task_id=task_id, error="Duplicate task id"))
+            continue
+        seen.add(task_id)
+        if task is None:
+            results.append(BulkItemResult(index=index, ok=False, task_id=task_id, error="Task not found"))
+            continue
+        try:
+            if payload.action == "complete":
+                target_status = plan_complete(task, lookups.statuses, now)
+            else:
+                target_status = plan_abandon(task, lookups.statuses)
+        except HTTPException as e:
+            if e.status_code == 404:
+                raise
+            results.append(BulkItemResult(index=index, ok=False, task_id=task_id, error=e.detail))
+            continue
+        targets[target_status.status_id].append(task_id)
+        results.append(BulkItemResult(index=index, ok=True, task_id=task_id, status=target_status.name))
+
+    # One set-based UPDATE per target status (at most two), committed together
+    for status_id, task_ids in targets.items():
+        values = {Task.status_id: status_id}
+        if lookups.statuses.name_of(status_id) == "Completed":
+            values[Task.finished_date] = now
+        db.query(Task).filter(Task.task_id.in_(task_ids)).update(values, synchronize_session=False)
+    bump_user_versions(db, (tasks[result.task_id].user_id for result in results if result.ok))
+    db.commit()
+
+    changed_by_user: Dict[int, List[dict]] = defaultdict(list)
+    for result in results:
+        if result.ok:
+            user_id = tasks[result.task_id].user_id
+            deadline_scheduler.untrack(user_id, result.task_id)
+            changed_by_user[user_id].append({"task_id": result.task_id, "status": result.status})
+    for user_id, changes in changed_by_user.items():
+        event_broker.publish(user_id, TASKS_STATUS_CHANGED, {"tasks": changes})
+
+    return bulk_response(results)
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+from typing import Iterator, List, Optional
 from utils.deps import db_dependency
+from utils.data_version import VersionedRead
 from utils.models import Task
+from utils.streaming import iter_row_batches
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -11,24 +15,104 @@ router = APIRouter()
 class TaskResponse(BaseModel):
     task_id: int
     title: str
-    description: str
+    description: Optional[str] = None
     due_date: datetime
 
     class Config:
         from_attribute = True
 
 
-# Endpoint to get tasks for a specific user using linear search
+def tasks_in_window(db, user_id: int, start: Optional[datetime], end: Optional[datetime]):
+    # Range scan on the (user_id, due_date) index; only the columns shown are read
+    query = db.query(Task.task_id, Task.title, Task.description, Task.due_date).filter(Task.user_id == user_id, Task.due_date.isnot(None))
+    if start:
+        query = query.filter(Task.due_date >= start)
+    if end:
+        query = query.filter(Task.due_date < end)
+    return query.order_by(Task.due_date, Task.task_id)
+
+# Endpoint to get a user's tasks due inside the [start, end) window shown by the calendar
 @router.get("/task-for-calendar", response_model=List[TaskResponse])
-def get_tasks(user_id: int, db: db_dependency):
-    # Fetch all tasks from the database
-    all_tasks = db.query(Task).all()
+def get_tasks(user_id: int, db: db_dependency, request: Request,
+              start: Optional[datetime] = None, end: Optional[datetime] = None):
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="'end' must be after 'start'")
+
+    # Due dates don't move with the clock, so only a task write changes this response
+    read = VersionedRead(request, db, user_id, time_dependent=False)
+    cached = read.cached()
+    if cached is not None:
+        return cached
 
-    # Linear search to filter tasks by user_id
-    user_tasks = [task for task in all_tasks if task.user_id == user_id]
+    user_tasks = tasks_in_window(db, user_id, start, end).all()
 
     # If no tasks are found for the user, you can return an empty list or raise an exception
     if not user_tasks:
         raise HTTPException(status_code=404, detail="No tasks found for this user")
 
-    return user_tasks
+    return read.respond([
+        {"task_id": task.task_id, "title": task.title, "description": task.description, "due_date": task.due_date}
+        for task in user_tasks
+    ])
+
+
+# ------------------- iCalendar feed ------------------- #
+def ics_escape(value: str) -> str:
+    return (
+        value.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+        .replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+def ics_line(line: str) -> str:
+    # RFC 5545 folds content lines longer than 75 octets
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for char in line:
+        char_bytes = char.encode()
+        if len(chunk) + len(char_bytes) > (75 if not parts else 74):
+            parts.append(chunk.decode())
+            chunk = b""
+        chunk += char_bytes
+    parts.append(chunk.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+def ics_time(value: datetime) -> str:
+    # Due dates are stored as local (UTC+7) wall-clock times, so they are written as floating times
+    return value.strftime("%Y%m%dT%H%M%S")
+
+def task_to_vevent(task: Task, stamp: str) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:task-{task.task_id}@task-manager",
+        f"DTSTAMP:{stamp}",
+        f"DTSTART:{ics_time(task.due_date)}",
+        "DURATION:PT0S",
+        f"SUMMARY:{ics_escape(task.title)}",
+    ]
+    if task.description:
+        lines.append(f"DESCRIPTION:{ics_escape(task.description)}")
+    lines.append("END:VEVENT")
+    return "".join(ics_line(line) for line in lines)
+
+def generate_ics(statement: Select) -> Iterator[str]:
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    yield ics_line("BEGIN:VCALENDAR")
+    yield ics_line("VERSION:2.0")
+    yield ics_line("PRODID:-//Task Manager//Tasks//EN")
+    yield ics_line("X-WR-CALNAME:Tasks")
+    for batch in iter_row_batches(statement, lambda task: task_to_vevent(task, stamp)):
+        yield "".join(batch)
+    yield ics_line("END:VCALENDAR")
+
+# Subscribable iCalendar export; events are written as rows stream out of the database
+@router.get("/task-for-calendar.ics")
+def get_tasks_ics(user_id: int, db: db_dependency, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    if start and end and end <= start:
+        raise HTTPException(status_code=400, detail="'end' must be after 'start'")
+    return StreamingResponse(
+        generate_ics(tasks_in_window(db, user_id, start, end).statement),
+        media_type="text/calendar; charset=utf-8",
+        headers={"Content-Disposition": 'inline; filename="tasks.ics"'}
+    )
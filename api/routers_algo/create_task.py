@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException, Depends
-from utils.models import Task, Category, Priority, Status  # Import your models
+from utils.models import Task  # Import your models
 from utils.deps import db_dependency  # Import your database dependency
+from utils.lookups import LookupSnapshot, lookup_dependency
+from utils.deadlines import deadline_scheduler
+from utils.events import TASK_CREATED, event_broker
+from utils.data_version import bump_user_version
 from pydantic import BaseModel
 from datetime import date, time, datetime
 
@@ -23,56 +27,44 @@ class TaskCreate(BaseModel):
     class Config:
         from_attribute = True
 
-@router.post("/tasks", response_model=TaskCreate)
-def create_task(task: TaskCreate, db: db_dependency):
-    # Fetch all categories, priorities, and statuses to perform linear search
-    categories = db.query(Category).all()
-    priorities = db.query(Priority).all()
-    statuses = db.query(Status).all()
-
-    # Linear search for category
-    category = None
-    for cat in categories:
-        if cat.category_id == task.category_id:
-            category = cat
-            break
-
-    # Linear search for priority
-    priority = None
-    for pri in priorities:
-        if pri.priority_id == task.priority_id:
-            priority = pri
-            break
+# O(1) lookups against the cached lookup tables
+def has_valid_lookups(task: TaskCreate, lookups: LookupSnapshot) -> bool:
+    return bool(
+        lookups.categories.get(task.category_id)
+        and lookups.priorities.get(task.priority_id)
+        and lookups.statuses.get(task.status_id)
+    )
 
-    # Linear search for status
-    status = None
-    for stat in statuses:
-        if stat.status_id == task.status_id:
-            status = stat
-            break
+# Column values for a new task row
+def task_values(task: TaskCreate) -> dict:
+    return {
+        "user_id": task.user_id,  # Replace this with actual user ID from session/authentication
+        "title": task.title,
+        "description": task.description,
+        # Combine due_date and due_time into a single datetime for storage in the database
+        "due_date": datetime.combine(task.due_date, task.due_time),
+        "is_important": task.is_important,
+        "category_id": task.category_id,
+        "priority_id": task.priority_id,
+        "status_id": task.status_id,
+    }
 
+@router.post("/tasks", response_model=TaskCreate)
+def create_task(task: TaskCreate, db: db_dependency, lookups: lookup_dependency):
     # If any of the items are not found, raise an error
-    if not category or not priority or not status:
+    if not has_valid_lookups(task, lookups):
         raise HTTPException(status_code=400, detail="Invalid category, priority, or status")
 
-    # Combine due_date and due_time into a single datetime for storage in the database
-    duedate = datetime.combine(task.due_date, task.due_time)
-    
     # Create a new task in the database
-    new_task = Task(
-        user_id=task.user_id,  # Replace this with actual user ID from session/authentication
-        title=task.title,
-        description=task.description,
-        due_date=duedate,  # Store the combined due date and time as TIMESTAMP
-        is_important=task.is_important,
-        category_id=task.category_id,
-        priority_id=task.priority_id,
-        status_id=task.status_id
-    )
+    new_task = Task(**task_values(task))
 
     db.add(new_task)
+    bump_user_version(db, new_task.user_id)
     db.commit()
     db.refresh(new_task)
+    ongoing_status = lookups.statuses.find("Ongoing")
+    if ongoing_status and new_task.status_id == ongoing_status.status_id:
+        deadline_scheduler.track_task(new_task)
 
     # Prepare the response with separate date and time
     response_task = {
@@ -86,5 +78,6 @@ def create_task(task: TaskCreate, db: db_dependency):
         "priority_id": new_task.priority_id,
         "status_id": new_task.status_id
     }
+    event_broker.publish(new_task.user_id, TASK_CREATED, {"task_id": new_task.task_id, **response_task})
 
     return response_task
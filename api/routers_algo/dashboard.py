@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy import func, literal, select, union_all
 from sqlalchemy.orm import Session
 from utils.deps import db_dependency
-from utils.models import Task, Category, Priority, Status
-from collections import defaultdict
+from utils.models import Task
+from utils.lookups import LookupSnapshot, lookup_dependency
+from utils.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from utils.task_status import effective_status_id
+from utils.data_version import VersionedRead, lookups_key
 from typing import Optional
 
 router = APIRouter(
@@ -10,75 +14,123 @@ router = APIRouter(
     tags=['algo']
 )
 
-def get_all_tasks_as_dict(db: Session, user_id: int):
-    # Fetch all tasks for the current user with related categories, priorities, and statuses
-    tasks = db.query(Task).filter(Task.user_id == user_id).all()  # Filter by user_id
-    
-    task_list = []
-    for task in tasks:
-        task_dict = {
-            "task_id": task.task_id,
-            "title": task.title,
-            "category": task.category.name if task.category else None,
-            "priority": task.priority.name,
-            "status": task.status.name,
-            "due_date": task.due_date,
-            "is_important": task.is_important,
-        }
-        task_list.append(task_dict)
-    
-    return task_list
+def get_effective_status_ids(lookups: LookupSnapshot):
+    ongoing_status = lookups.statuses.find("Ongoing")
+    delayed_status = lookups.statuses.find("Delayed")
+    if not ongoing_status or not delayed_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
+    return effective_status_id(ongoing_status.status_id, delayed_status.status_id)
+
+def count_tasks_by_lookup(db: Session, user_id: int, lookups: LookupSnapshot):
+    # One statement computes the category, priority and status breakdowns; ids are
+    # turned into names through the cached lookup tables instead of joins per row
+    user_tasks = (
+        select(
+            Task.category_id.label("category_id"),
+            Task.priority_id.label("priority_id"),
+            get_effective_status_ids(lookups).label("status_id")
+        )
+        .where(Task.user_id == user_id)
+        .subquery()
+    )
 
-def count_tasks_by_field(tasks, field_name):
-    counter = defaultdict(int)
-    for task in tasks:
-        field_value = task[field_name]
-        counter[field_value] += 1
-    return dict(counter)
+    if db.get_bind().dialect.name == "postgresql":
+        statement = (
+            select(
+                func.grouping(user_tasks.c.category_id).label("by_category"),
+                func.grouping(user_tasks.c.priority_id).label("by_priority"),
+                user_tasks.c.category_id,
+                user_tasks.c.priority_id,
+                user_tasks.c.status_id,
+                func.count().label("total")
+            )
+            .group_by(func.grouping_sets(
+                user_tasks.c.category_id, user_tasks.c.priority_id, user_tasks.c.status_id
+            ))
+        )
+    else:
+        # Dialects without GROUPING SETS (SQLite test runs) get the same rows via UNION ALL
+        def grouped(by_category, by_priority, category_id, priority_id, status_id, column):
+            return select(
+                literal(by_category), literal(by_priority), category_id, priority_id, status_id, func.count()
+            ).group_by(column)
 
-def merge_sort(tasks, key):
-    if len(tasks) <= 1:
-        return tasks
-    
-    mid = len(tasks) // 2
-    left_half = merge_sort(tasks[:mid], key)
-    right_half = merge_sort(tasks[mid:], key)
-    
-    return merge(left_half, right_half, key)
+        c = user_tasks.c
+        statement = union_all(
+            grouped(0, 1, c.category_id, literal(None), literal(None), c.category_id),
+            grouped(1, 0, literal(None), c.priority_id, literal(None), c.priority_id),
+            grouped(1, 1, literal(None), literal(None), c.status_id, c.status_id),
+        )
 
-def merge(left, right, key):
-    result = []
-    while left and right:
-        if left[0][key] <= right[0][key]:
-            result.append(left.pop(0))
+    category_counts, priority_counts, status_counts = {}, {}, {}
+    for by_category, by_priority, category_id, priority_id, status_id, total in db.execute(statement):
+        if by_category == 0:
+            category_counts[lookups.categories.name_of(category_id)] = total
+        elif by_priority == 0:
+            priority_counts[lookups.priorities.name_of(priority_id)] = total
         else:
-            result.append(right.pop(0))
-    result += left
-    result += right
-    return result
+            status_counts[lookups.statuses.name_of(status_id)] = total
+    return category_counts, priority_counts, status_counts
 
-def search_tasks_by_title(tasks, search_term):
-    result = []
-    for task in tasks:
-        if search_term.lower() in task["title"].lower():
-            result.append(task)
-    return result
+def get_task_page(db: Session, user_id: int, lookups: LookupSnapshot, limit: int, after: Optional[str]):
+    query = (
+        db.query(
+            Task.task_id, Task.title, Task.category_id, Task.priority_id,
+            get_effective_status_ids(lookups).label("status_id"), Task.due_date, Task.is_important
+        )
+        .filter(Task.user_id == user_id)
+    )
+    if after:
+        _, last_id = decode_cursor(after, "task_id", False)
+        query = query.filter(Task.task_id > last_id)
+    rows = query.order_by(Task.task_id).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("task_id", False, rows[-1].task_id, rows[-1].task_id)
+
+    tasks = [
+        {
+            "task_id": row.task_id,
+            "title": row.title,
+            "category": lookups.categories.name_of(row.category_id),
+            "priority": lookups.priorities.name_of(row.priority_id),
+            "status": lookups.statuses.name_of(row.status_id),
+            "due_date": row.due_date,
+            "is_important": row.is_important,
+        }
+        for row in rows
+    ]
+    return tasks, next_cursor
 
 @router.get("/tasks-overview")
-def get_tasks_overview(db: db_dependency, user_id: int):
-    # Retrieve all tasks for the current user from the database
-    tasks = get_all_tasks_as_dict(db, user_id)
+def get_tasks_overview(
+    db: db_dependency,
+    lookups: lookup_dependency,
+    request: Request,
+    user_id: int,
+    include_tasks: bool = False,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
+    read = VersionedRead(request, db, user_id, extra=lookups_key(lookups))
+    cached = read.cached()
+    if cached is not None:
+        return cached
 
-    # Count tasks by category, priority, and status
-    category_counts = count_tasks_by_field(tasks, "category")
-    priority_counts = count_tasks_by_field(tasks, "priority")
-    status_counts = count_tasks_by_field(tasks, "status")
+    # Count tasks by category, priority, and status in a single aggregate query
+    category_counts, priority_counts, status_counts = count_tasks_by_lookup(db, user_id, lookups)
 
-    # Return the tasks, number of tasks, and aggregated data
-    return {
-        "total_tasks": len(tasks),  # Total number of tasks for the user
-        "tasks": tasks,  # List of tasks
+    overview = {
+        "total_tasks": sum(status_counts.values()),  # Total number of tasks for the user
         "category_counts": category_counts,
         "priority_counts": priority_counts,
         "status_counts": status_counts,
     }
+
+    # The task list is opt-in and paginated so the overview payload stays small
+    if include_tasks:
+        overview["tasks"], overview["next_cursor"] = get_task_page(db, user_id, lookups, limit, after)
+
+    return read.respond(overview)
@@ -1,7 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from typing import List
-from utils.models import Category, Priority, Status, Weekday
-from utils.deps import db_dependency  # Import your dependency from deps.py
+from utils.deps import get_current_admin
+from utils.lookups import lookup_dependency, lookup_registry, cached_table_response
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -39,30 +39,34 @@ class WeekdayResponse(BaseModel):
     class Config:
         from_attribute = True
 
+# Lookup tables are served from the process-wide registry with an ETag, so browsers
+# revalidate with If-None-Match and get a bodiless 304 while nothing has changed
 @router.get("/categories", response_model=List[CategoryResponse])
-def get_categories(db: db_dependency):
-    categories = db.query(Category).all()
-    if not categories:
+def get_categories(request: Request, lookups: lookup_dependency):
+    if not lookups.categories:
         raise HTTPException(status_code=404, detail="No categories found.")
-    return categories
+    return cached_table_response(request, lookups.categories)
 
 @router.get("/priorities", response_model=List[PriorityResponse])
-def get_priorities(db: db_dependency):
-    priorities = db.query(Priority).all()
-    if not priorities:
+def get_priorities(request: Request, lookups: lookup_dependency):
+    if not lookups.priorities:
         raise HTTPException(status_code=404, detail="No priorities found.")
-    return priorities
+    return cached_table_response(request, lookups.priorities)
 
 @router.get("/statuses", response_model=List[StatusResponse])
-def get_statuses(db: db_dependency):
-    statuses = db.query(Status).all()
-    if not statuses:
+def get_statuses(request: Request, lookups: lookup_dependency):
+    if not lookups.statuses:
         raise HTTPException(status_code=404, detail="No statuses found.")
-    return statuses
+    return cached_table_response(request, lookups.statuses)
 
 @router.get("/weekdays", response_model=List[WeekdayResponse])
-def get_weekdays(db: db_dependency):
-    weekdays = db.query(Weekday).all()
-    if not weekdays:
+def get_weekdays(request: Request, lookups: lookup_dependency):
+    if not lookups.weekdays:
         raise HTTPException(status_code=404, detail="No weekdays found.")
-    return weekdays
+    return cached_table_response(request, lookups.weekdays)
+
+# Drop the cached lookup tables so the next request reloads them from the database (admin only)
+@router.post("/lookups/invalidate", dependencies=[Depends(get_current_admin)])
+def invalidate_lookups():
+    lookup_registry.invalidate()
+    return {"message": "Lookup cache invalidated"}
@@ -1,9 +1,12 @@
 from pydantic import BaseModel
 from typing import Optional
-from fastapi import APIRouter, Depends
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Request
+from datetime import datetime
+from utils.deadlines import ONE_DAY, ONE_WEEK, deadline_scheduler
 from utils.deps import db_dependency
-from utils.models import Task
+from utils.data_version import VersionedRead
+from utils.lookups import lookup_dependency
+from utils.task_status import current_time
 from typing import Dict, List
 
 class TaskResponseOneDayLeft(BaseModel):
@@ -23,14 +26,24 @@ class TaskResponseOneWeekLeft(BaseModel):
 
 router = APIRouter()
 
-# Modify the endpoint to filter ongoing tasks
+# Ongoing tasks due within a day / a week, answered from the in-memory deadline scheduler
 @router.get("/tasks/grouped", response_model=Dict[str, List[Dict]])
-def get_grouped_tasks(user_id:int,db: db_dependency):
-    # Assuming 'Ongoing' status has a status_id of 1 (you can adjust this based on your DB)
-    ongoing_status_id = 1
-    
-    # Query only ongoing tasks
-    tasks = db.query(Task).filter(Task.status_id == ongoing_status_id, Task.user_id == user_id).all()
+def get_grouped_tasks(user_id:int,db: db_dependency, lookups: lookup_dependency, request: Request):
+    ongoing_status = lookups.statuses.find("Ongoing")
+    if not ongoing_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
+
+    # The ETag changes once per time bucket, or sooner after a task write. The body is not
+    # cached: remaining times are computed for every full response, so they never run past due
+    read = VersionedRead(request, db, user_id, cache_body=False)
+    cached = read.cached()
+    if cached is not None:
+        return cached
+
+    buckets = deadline_scheduler.grouped(db, user_id, ongoing_status.status_id, read.version)
+
+    # Get current time
+    now = current_time()
 
     # Initialize groups
     grouped_tasks = {
@@ -38,34 +51,25 @@ def get_grouped_tasks(user_id:int,db: db_dependency):
         "oneweek_left": []
     }
 
-    # Get current time
-    now = datetime.utcnow()
-
-    for task in tasks:
-        if task.due_date:
-            # Calculate the remaining time
-            time_remaining = task.due_date - now
-            days_remaining = time_remaining.days
-
-            # If time remaining is less than or equal to 1 day
-            if 0 <= time_remaining.total_seconds() <= 86400:  # 86400 seconds = 1 day
-                grouped_tasks["oneday_left"].append({
-                    "task_id": task.task_id,
-                    "title": task.title,
-                    "description": task.description,
-                    "due_date": task.due_date.isoformat(),  # Convert datetime to ISO format string
-                    "time_remain": str(time_remaining)  # Example format: '00:10:00'
-                })
+    for task in buckets[ONE_DAY]:
+        time_remaining = task.due_date - now
+        grouped_tasks["oneday_left"].append({
+            "task_id": task.task_id,
+            "title": task.title,
+            "description": task.description,
+            "due_date": task.due_date.isoformat(),  # Convert datetime to ISO format string
+            "time_remain": str(time_remaining)  # Example format: '00:10:00'
+        })
 
-            # If time remaining is between 1 and 7 days
-            elif 1 < days_remaining <= 7:
-                grouped_tasks["oneweek_left"].append({
-                    "task_id": task.task_id,
-                    "title": task.title,
-                    "description": task.description,
-                    "due_date": task.due_date,
-                    "day_remain": days_remaining,
-                    "time_remain": str(time_remaining)  # Example format: '6 days, 1:00:00'
-                })
+    for task in buckets[ONE_WEEK]:
+        time_remaining = task.due_date - now
+        grouped_tasks["oneweek_left"].append({
+            "task_id": task.task_id,
+            "title": task.title,
+            "description": task.description,
+            "due_date": task.due_date,
+            "day_remain": time_remaining.days,
+            "time_remain": str(time_remaining)  # Example format: '6 days, 1:00:00'
+        })
 
-    return grouped_tasks
+    return read.respond(grouped_tasks)
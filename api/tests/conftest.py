@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The app modules import `utils.*` from the api directory and build their engines at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def db():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from utils.database import Base
+    from utils import models
+
+    # The task tables only: login_history's composite key with a serial id is Postgres-specific
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[
+        model.__table__ for model in (
+            models.User, models.Category, models.Priority, models.Status, models.Weekday, models.Task,
+            models.User_Data_Version
+        )
+    ])
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
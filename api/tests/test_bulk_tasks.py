@@ -0,0 +1,51 @@
+from datetime import date, time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")  # utils.database also creates the (lazily connecting) async engine
+
+from routers_algo.bulk_tasks import BulkTaskCreate, create_tasks_bulk
+from routers_algo.create_task import TaskCreate
+from utils.deps import AuthUser
+from utils.lookups import LookupRegistry
+from utils.models import Category, Priority, Status, Task, User
+
+
+def seed(db) -> None:
+    for user_id in (1, 2):
+        db.add(User(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", password="x"))
+    db.add(Category(category_id=1, name="Work"))
+    db.add(Priority(priority_id=1, name="High"))
+    db.add(Status(status_id=1, name="Ongoing"))
+    db.commit()
+
+def task(user_id: int, title: str = "Write report") -> TaskCreate:
+    return TaskCreate(
+        user_id=user_id, title=title, due_date=date(2030, 1, 1), due_time=time(9), is_important=False,
+        category_id=1, priority_id=1
+    )
+
+def caller(user_id: int, is_admin: bool = False) -> AuthUser:
+    return AuthUser(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", is_admin=is_admin)
+
+
+def test_invalid_items_fail_alone(db):
+    seed(db)
+    lookups = LookupRegistry(ttl_seconds=0)._load(db)
+    payload = BulkTaskCreate(tasks=[task(1), task(1, "x" * 256), task(2), task(1, "Plan sprint")])
+
+    response = create_tasks_bulk(payload, db, lookups, caller(1))
+
+    assert [result.ok for result in response.results] == [True, False, False, True]
+    assert [result.error for result in response.results if not result.ok] == [
+        "Title longer than 255 characters", "Cannot create tasks for another user"
+    ]
+    assert sorted(title for title, in db.query(Task.title)) == ["Plan sprint", "Write report"]
+
+def test_admin_creates_tasks_for_other_users(db):
+    seed(db)
+    lookups = LookupRegistry(ttl_seconds=0)._load(db)
+    response = create_tasks_bulk(BulkTaskCreate(tasks=[task(2), task(99)]), db, lookups, caller(1, is_admin=True))
+    assert [result.ok for result in response.results] == [True, False]
+    assert response.results[1].error == "User not found"
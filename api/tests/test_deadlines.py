@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from utils.deadlines import ONE_DAY, ONE_WEEK, DeadlineScheduler, TaskDeadline
+from utils.models import Task, User
+from utils.task_status import current_time
+
+NOW = datetime(2026, 1, 1)
+
+
+def buckets(scheduler: DeadlineScheduler, user_id: int) -> dict:
+    return {name: sorted(bucket) for name, bucket in scheduler._users[user_id].buckets.items()}
+
+
+def test_transitions_apply_just_after_their_instant():
+    scheduler = DeadlineScheduler(reload_seconds=300, max_users=10)
+    entered = []
+    scheduler.add_listener(lambda bucket, deadline: entered.append((bucket, deadline.task_id)))
+    scheduler._install_user(1, [TaskDeadline(7, 1, "report", None, NOW + timedelta(days=8))], NOW)
+    assert buckets(scheduler, 1) == {ONE_DAY: [], ONE_WEEK: []}
+
+    scheduler.advance(NOW + timedelta(microseconds=1))
+    assert buckets(scheduler, 1) == {ONE_DAY: [], ONE_WEEK: [7]}
+    # Exactly two days left still counts as the week bucket, just after it does not
+    scheduler.advance(NOW + timedelta(days=6))
+    assert buckets(scheduler, 1) == {ONE_DAY: [], ONE_WEEK: [7]}
+    scheduler.advance(NOW + timedelta(days=6, microseconds=1))
+    assert buckets(scheduler, 1) == {ONE_DAY: [], ONE_WEEK: []}
+    scheduler.advance(NOW + timedelta(days=7, microseconds=1))
+    assert buckets(scheduler, 1) == {ONE_DAY: [7], ONE_WEEK: []}
+    scheduler.advance(NOW + timedelta(days=8, microseconds=1))
+    assert scheduler._users[1].tasks == {}
+    assert entered == [(ONE_WEEK, 7), (ONE_DAY, 7)]
+
+
+def test_least_recently_read_users_are_dropped():
+    scheduler = DeadlineScheduler(reload_seconds=300, max_users=2)
+    for user_id in (1, 2, 3):
+        scheduler._install_user(user_id, [], NOW)
+    assert list(scheduler._users) == [2, 3]
+
+
+def test_new_data_version_reloads_before_the_timer(db):
+    db.add(User(user_id=1, username="user1", email="user1@example.com", password="x"))
+    db.commit()
+    scheduler = DeadlineScheduler(reload_seconds=300, max_users=10)
+    assert scheduler.grouped(db, 1, ongoing_status_id=1, version=1) == {ONE_DAY: [], ONE_WEEK: []}
+
+    # Written through another worker, which only bumped the shared data version
+    db.add(Task(task_id=5, user_id=1, title="Pay rent", priority_id=1, status_id=1,
+                due_date=current_time() + timedelta(hours=3)))
+    db.commit()
+    assert scheduler.grouped(db, 1, ongoing_status_id=1, version=1)[ONE_DAY] == []
+    assert [deadline.task_id for deadline in scheduler.grouped(db, 1, ongoing_status_id=1, version=2)[ONE_DAY]] == [5]
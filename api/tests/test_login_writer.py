@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+from utils.login_writer import LoginHistoryWriter
+
+UNKNOWN_USER = 99
+
+
+def make_writer(fail_with=None) -> LoginHistoryWriter:
+    writer = LoginHistoryWriter(max_events=100, batch_size=50, interval_seconds=1, copy_threshold=1000)
+    writer.batches = []
+
+    def write(events):
+        if fail_with is not None:
+            raise fail_with
+        if any(user_id == UNKNOWN_USER for user_id, _, _ in events):
+            raise IntegrityError("INSERT INTO login_history", {}, Exception("foreign key violation"))
+        writer.batches.append([user_id for user_id, _, _ in events])
+
+    writer._write = write
+    return writer
+
+
+def test_rejected_events_are_dropped_and_the_rest_written():
+    writer = make_writer()
+    for user_id in (1, 2, UNKNOWN_USER, 4, 5):
+        writer.record(user_id)
+    assert writer.flush() == 4
+    assert sorted(user_id for batch in writer.batches for user_id in batch) == [1, 2, 4, 5]
+    assert writer.stats()["rejected"] == 1
+    assert writer.stats()["pending"] == 0
+
+
+def test_unreachable_database_requeues_the_batch():
+    writer = make_writer(fail_with=OperationalError("INSERT INTO login_history", {}, Exception("connection refused")))
+    for user_id in (1, 2, 3):
+        writer.record(user_id)
+    assert writer.flush() == 0
+    assert [user_id for user_id, _, _ in writer._events] == [1, 2, 3]
+    assert writer.stats()["failed_flushes"] == 1
@@ -0,0 +1,69 @@
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("asyncpg")  # utils.database also creates the (lazily connecting) async engine
+
+from utils.data_version import bump_user_version
+from utils.models import Task, User
+from utils.task_search import InvertedIndex, fallback_index, search_tasks
+
+
+def add_user(db, user_id: int) -> None:
+    db.add(User(user_id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", password="x"))
+
+def add_task(db, task_id: int, user_id: int, title: str, description: str = None) -> None:
+    db.add(Task(task_id=task_id, user_id=user_id, title=title, description=description, priority_id=1, status_id=1))
+
+def hit_ids(hits):
+    return [task.task_id for task, _ in hits]
+
+
+def test_title_match_ranks_above_description_match():
+    index = InvertedIndex([(1, "Weekly planning", "write the report"), (2, "Quarterly report", None)])
+    assert [task_id for task_id, _ in index.search("report")] == [2, 1]
+
+def test_last_term_matches_as_prefix():
+    index = InvertedIndex([(1, "Dentist appointment", None), (2, "Apply for visa", None)])
+    assert [task_id for task_id, _ in index.search("appoi")] == [1]
+
+def test_single_edit_typo_matches():
+    index = InvertedIndex([(1, "Renew passport", None)])
+    assert [task_id for task_id, _ in index.search("pasport renew")] == [1]
+
+def test_every_term_must_match():
+    index = InvertedIndex([(1, "Buy milk", None), (2, "Buy bread", None)])
+    assert [task_id for task_id, _ in index.search("buy milk")] == [1]
+
+
+def test_search_tasks_uses_fallback_on_sqlite(db):
+    add_user(db, 1)
+    add_user(db, 2)
+    add_task(db, 1, 1, "Quarterly report", "numbers for finance")
+    add_task(db, 2, 1, "Team lunch", "book a table, then report back")
+    add_task(db, 3, 2, "Quarterly report", None)
+    db.commit()
+
+    hits = search_tasks(db, 1, "report", limit=10)
+    assert hit_ids(hits) == [1, 2]  # Only the user's own tasks, title hit first
+    assert hit_ids(search_tasks(db, 1, "report", limit=1, offset=1)) == [2]
+    assert search_tasks(db, 1, "   ", limit=10) == []
+
+def test_committed_task_write_invalidates_fallback_index(db):
+    add_user(db, 1)
+    add_task(db, 1, 1, "Water plants")
+    db.commit()
+    assert hit_ids(search_tasks(db, 1, "garden", limit=10)) == []
+
+    add_task(db, 2, 1, "Garden cleanup")
+    bump_user_version(db, 1)
+    db.commit()
+    assert hit_ids(search_tasks(db, 1, "garden", limit=10)) == [2]
+
+def test_fallback_index_evicts_least_recently_searched_user(db, monkeypatch):
+    for user_id in (1, 2, 3):
+        add_user(db, user_id)
+    db.commit()
+    monkeypatch.setattr(fallback_index, "maxsize", 2)
+    for user_id in (1, 2, 1, 3):
+        fallback_index.get(db, user_id)
+    assert list(fallback_index._indexes) == [1, 3]
@@ -0,0 +1,110 @@
+import hashlib
+import time
+from typing import Hashable, Iterable, Mapping, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from utils.database import dialect_insert
+from utils.http_cache import etag_matches
+from utils.lookups import LookupSnapshot
+from utils.models import User_Data_Version
+from utils.pagination import page_headers
+from utils.principal_cache import TTLCache
+from utils.serialization import dumps
+from utils.settings import TASK_CACHE_TIME_BUCKET_SECONDS, TASK_RESPONSE_CACHE_SIZE
+from utils.task_search import invalidate_task_search
+
+# Browsers keep the body but revalidate with If-None-Match on every use
+TASK_CACHE_CONTROL = "private, no-cache"
+
+# Session.info key of the users whose tasks the current transaction has written
+CHANGED_USERS_KEY = "changed_task_users"
+
+# (body, headers) keyed by the same tuple the ETag is derived from. Entries live at most one
+# time bucket; a new version changes the key, so a stale body is never served.
+response_cache: TTLCache = TTLCache(max(TASK_RESPONSE_CACHE_SIZE, 1), TASK_CACHE_TIME_BUCKET_SECONDS)
+
+
+# ------------------- Versions ------------------- #
+# Run inside the transaction of the write, so the version moves exactly when the data does
+def bump_user_versions(db: Session, user_ids: Iterable[int]) -> None:
+    rows = [{"user_id": user_id, "version": 1} for user_id in sorted(set(user_ids))]
+    if not rows:
+        return
+    db.info.setdefault(CHANGED_USERS_KEY, set()).update(row["user_id"] for row in rows)
+    table = User_Data_Version.__table__
+    statement = dialect_insert(db.get_bind().dialect.name)(table).values(rows)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={"version": table.c.version + 1}
+    ))
+
+# Per-process derived state (the search fallback's indexes) is dropped once the write is committed,
+# so a search running meanwhile cannot rebuild it from the old rows
+@event.listens_for(Session, "after_commit")
+def invalidate_changed_users(session: Session) -> None:
+    for user_id in session.info.pop(CHANGED_USERS_KEY, ()):
+        invalidate_task_search(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def forget_changed_users(session: Session) -> None:
+    session.info.pop(CHANGED_USERS_KEY, None)
+
+def bump_user_version(db: Session, user_id: int) -> None:
+    bump_user_versions(db, [user_id])
+
+def get_user_version(db: Session, user_id: int) -> int:
+    version = db.execute(
+        select(User_Data_Version.version).where(User_Data_Version.user_id == user_id)
+    ).scalar()
+    return version or 0
+
+def lookups_key(lookups: LookupSnapshot) -> Tuple[str, ...]:
+    # Responses carry lookup names, so a renamed category/priority/status changes the ETag too
+    return (lookups.categories.etag, lookups.priorities.etag, lookups.statuses.etag)
+
+
+# ------------------- Conditional reads ------------------- #
+class VersionedRead:
+    """
+    ETag and response cache for a per-user task read. The key is the user's data version,
+    the path and query parameters, and, for responses that change with the clock alone
+    (derived 'Delayed', deadline buckets), the current time bucket. With cache_body=False only
+    the ETag is used: the body is built on every full response, e.g. when it holds times that
+    move on within a bucket.
+    """
+
+    def __init__(self, request: Request, db: Session, user_id: int,
+                 extra: Hashable = None, time_dependent: bool = True, cache_body: bool = True):
+        self.request = request
+        self.cache_body = cache_body and TASK_RESPONSE_CACHE_SIZE > 0
+        self.version = get_user_version(db, user_id)
+        bucket = int(time.time() // TASK_CACHE_TIME_BUCKET_SECONDS) if time_dependent else None
+        self.key = (
+            user_id, request.url.path, tuple(sorted(request.query_params.multi_items())),
+            self.version, bucket, extra
+        )
+        self.etag = '"' + hashlib.sha1(repr(self.key).encode()).hexdigest() + '"'
+
+    def _headers(self, extra: Optional[Mapping[str, str]] = None) -> dict:
+        return {**(extra or {}), "ETag": self.etag, "Cache-Control": TASK_CACHE_CONTROL}
+
+    def cached(self) -> Optional[Response]:
+        if etag_matches(self.request.headers.get("if-none-match"), self.etag):
+            return Response(status_code=304, headers=self._headers())
+        if self.cache_body:
+            entry = response_cache.get(self.key)
+            if entry is not None:
+                body, headers = entry
+                return Response(content=body, media_type="application/json", headers=self._headers(headers))
+        return None
+
+    def respond(self, content, headers: Optional[Mapping[str, str]] = None) -> Response:
+        # Pagination headers are part of what gets cached
+        body = dumps(content)
+        kept = page_headers(headers or {})
+        if self.cache_body:
+            response_cache.set(self.key, (body, kept))
+        return Response(content=body, media_type="application/json", headers=self._headers(kept))
@@ -1,8 +1,55 @@
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from utils.settings import POSTGRES_URL
+from sqlalchemy.pool import NullPool
+from utils.db_pool import TimedAsyncQueuePool, TimedQueuePool
+from utils.settings import (
+    POSTGRES_URL, POSTGRES_ASYNC_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_PGBOUNCER
+)
 
-engine = create_engine(POSTGRES_URL)
+def _engine_options(url: str, pool_class) -> dict:
+    # SQLite (test runs) keeps SQLAlchemy's default pool; pool tuning only applies to Postgres
+    if make_url(url).get_backend_name() != "postgresql":
+        return {}
+    if DB_PGBOUNCER and DB_POOL_SIZE == 0:
+        # PgBouncer does the pooling; hand every checkout straight to it
+        return {"poolclass": NullPool}
+    if DB_POOL_SIZE < 1:
+        # QueuePool would read 0 as an unbounded pool and open connections without limit
+        raise ValueError("DB_POOL_SIZE must be at least 1 (0 is only allowed with DB_PGBOUNCER=true)")
+    return {
+        "poolclass": pool_class,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def _async_connect_args(url: str) -> dict:
+    # PgBouncer in transaction mode cannot keep server-side prepared statements across transactions
+    if DB_PGBOUNCER and make_url(url).get_backend_name() == "postgresql":
+        return {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    return {}
+
+engine = create_engine(POSTGRES_URL, **_engine_options(POSTGRES_URL, TimedQueuePool))
 SessionLocal = sessionmaker(autocommit=False,autoflush=False,bind=engine)
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+# Async engine (asyncpg) for the async def handlers, so DB round trips don't block the event loop.
+# expire_on_commit=False keeps loaded attributes usable after commit without an implicit lazy load.
+async_engine = create_async_engine(
+    POSTGRES_ASYNC_URL,
+    connect_args=_async_connect_args(POSTGRES_ASYNC_URL),
+    **_engine_options(POSTGRES_ASYNC_URL, TimedAsyncQueuePool)
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def dialect_insert(dialect_name: str):
+    # INSERT ... ON CONFLICT is spelled the same way by the Postgres and SQLite dialects
+    from sqlalchemy.dialects import postgresql, sqlite
+    return sqlite.insert if dialect_name == "sqlite" else postgresql.insert
@@ -0,0 +1,93 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import List
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (ms) of the checkout wait-time histogram buckets; the last bucket is +Inf
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+
+class WaitHistogram:
+    """Cumulative histogram of how long callers waited for a pooled connection."""
+
+    def __init__(self, buckets: List[float] = WAIT_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum_ms = 0.0
+        self._timeouts = 0
+        self._lock = threading.Lock()
+
+    def observe(self, wait_ms: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self.buckets, wait_ms)] += 1
+            self._sum_ms += wait_ms
+
+    def timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self._counts)
+            total_ms = self._sum_ms
+            timeouts = self._timeouts
+        cumulative, running = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += count
+            cumulative[bound] = running
+        return {
+            "count": running,
+            "sum_ms": round(total_ms, 3),
+            "timeouts": timeouts,
+            "buckets_ms": cumulative,
+        }
+
+
+class _TimedCheckoutMixin:
+    # _do_get is where QueuePool blocks waiting for a free connection or overflow slot
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_histogram = WaitHistogram()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_histogram = self.wait_histogram
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            # Only a pool exhausted for pool_timeout; connect and auth errors propagate uncounted
+            self.wait_histogram.timeout()
+            raise
+        self.wait_histogram.observe((time.perf_counter() - started) * 1000)
+        return connection
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(pool) -> dict:
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+        })
+    if hasattr(pool, "wait_histogram"):
+        status["checkout_wait"] = pool.wait_histogram.snapshot()
+    return status
@@ -0,0 +1,247 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from utils.models import Task
+from utils.settings import DEADLINE_MAX_USERS, DEADLINE_RELOAD_SECONDS
+from utils.task_status import current_time
+
+logger = logging.getLogger(__name__)
+
+ONE_DAY = "oneday_left"
+ONE_WEEK = "oneweek_left"
+
+# Bucket boundaries, matching the original /tasks/grouped rules:
+#   oneday_left  -> 0 <= remaining < 1 day
+#   oneweek_left -> remaining.days between 2 and 7
+# Both ranges include their start and exclude their end, so every transition takes effect
+# just after its instant: an entry is due once `at < now`, in _schedule and advance alike.
+DAY_WINDOW = timedelta(days=1)
+WEEK_START = timedelta(days=2)
+WEEK_END = timedelta(days=8)
+
+
+@dataclass
+class TaskDeadline:
+    task_id: int
+    user_id: int
+    title: str
+    description: Optional[str]
+    due_date: datetime
+
+
+def is_due(at: datetime, now: datetime) -> bool:
+    return at < now
+
+
+def bucket_for(remaining: timedelta) -> Optional[str]:
+    if timedelta(0) <= remaining < DAY_WINDOW:
+        return ONE_DAY
+    if WEEK_START <= remaining < WEEK_END:
+        return ONE_WEEK
+    return None
+
+
+class _UserDeadlines:
+    def __init__(self, version: Optional[int] = None):
+        self.tasks: Dict[int, TaskDeadline] = {}
+        self.buckets: Dict[str, Dict[int, TaskDeadline]] = {ONE_DAY: {}, ONE_WEEK: {}}
+        self.loaded_at = time.monotonic()
+        # The user's data version when loaded (utils.data_version), if the caller knew it
+        self.version = version
+
+
+class DeadlineScheduler:
+    """
+    Min-heap of bucket transitions for ongoing tasks. Each task schedules the instants at
+    which it enters/leaves the "one week" and "one day" buckets; advance() pops the transitions
+    that are due, so buckets stay current without rescanning every task on every poll.
+    At most max_users users are held; the least recently read are dropped and reload on their
+    next read. The lock is only taken off the event loop (sync routes and worker threads).
+    """
+
+    def __init__(self, reload_seconds: float, max_users: int):
+        self.reload_seconds = reload_seconds
+        self.max_users = max_users
+        self._lock = threading.RLock()
+        self._users: "OrderedDict[int, _UserDeadlines]" = OrderedDict()
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()
+        self._listeners: List[Callable[[str, TaskDeadline], None]] = []
+
+    # ------------------- Feeding ------------------- #
+    def _schedule(self, deadline: TaskDeadline, now: datetime) -> None:
+        for offset in (WEEK_END, WEEK_START, DAY_WINDOW, timedelta(0)):
+            at = deadline.due_date - offset
+            if is_due(at, now):
+                continue
+            heapq.heappush(self._heap, (at, next(self._sequence), deadline.user_id, deadline.task_id))
+
+    def _place(self, state: _UserDeadlines, deadline: TaskDeadline, now: datetime) -> Optional[str]:
+        # Returns the bucket the task entered, if it changed
+        previous = None
+        for name, bucket in state.buckets.items():
+            if bucket.pop(deadline.task_id, None) is not None:
+                previous = name
+        bucket = bucket_for(deadline.due_date - now)
+        if bucket:
+            state.buckets[bucket][deadline.task_id] = deadline
+            if bucket != previous:
+                return bucket
+        return None
+
+    def track(self, deadline: TaskDeadline, now: Optional[datetime] = None) -> None:
+        # Only users already held in memory are updated; others load on their next read
+        now = now or current_time()
+        with self._lock:
+            state = self._users.get(deadline.user_id)
+            if state is None:
+                return
+            state.tasks[deadline.task_id] = deadline
+            entered = self._place(state, deadline, now)
+            self._schedule(deadline, now)
+        if entered:
+            self._notify([(entered, deadline)])
+
+    def track_task(self, task: Task) -> None:
+        if task.due_date is not None:
+            self.track(TaskDeadline(task.task_id, task.user_id, task.title, task.description, task.due_date))
+
+    def untrack(self, user_id: int, task_id: int) -> None:
+        # Stale heap entries of removed tasks are skipped when popped
+        with self._lock:
+            state = self._users.get(user_id)
+            if state is None:
+                return
+            state.tasks.pop(task_id, None)
+            for bucket in state.buckets.values():
+                bucket.pop(task_id, None)
+
+    def forget_user(self, user_id: int) -> None:
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def _fetch_user(self, db: Session, user_id: int, ongoing_status_id: int, now: datetime) -> List[TaskDeadline]:
+        rows = (
+            db.query(Task.task_id, Task.user_id, Task.title, Task.description, Task.due_date)
+            .filter(Task.user_id == user_id, Task.status_id == ongoing_status_id, Task.due_date >= now)
+            .all()
+        )
+        return [TaskDeadline(*row) for row in rows]
+
+    def _install_user(self, user_id: int, deadlines: List[TaskDeadline], now: datetime,
+                      version: Optional[int] = None) -> _UserDeadlines:
+        previous = self._users.pop(user_id, None)
+        state = _UserDeadlines(version)
+        self._users[user_id] = state
+        if len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+            self._compact()
+        for deadline in deadlines:
+            state.tasks[deadline.task_id] = deadline
+            bucket = bucket_for(deadline.due_date - now)
+            if bucket:
+                state.buckets[bucket][deadline.task_id] = deadline
+            # On a reload, tasks whose deadline is unchanged already have their transitions queued
+            known = previous.tasks.get(deadline.task_id) if previous else None
+            if known is None or known.due_date != deadline.due_date:
+                self._schedule(deadline, now)
+        return state
+
+    def _compact(self) -> None:
+        # Entries of dropped users and tasks are otherwise only discarded when they come due
+        live = sum(len(state.tasks) for state in self._users.values()) * 4
+        if len(self._heap) > 2 * live + 1024:
+            self._heap = [
+                entry for entry in self._heap
+                if entry[2] in self._users and entry[3] in self._users[entry[2]].tasks
+            ]
+            heapq.heapify(self._heap)
+
+    # ------------------- Time ------------------- #
+    def _advance(self, now: datetime) -> List[Tuple[str, TaskDeadline]]:
+        entered = []
+        while self._heap and is_due(self._heap[0][0], now):
+            _, _, user_id, task_id = heapq.heappop(self._heap)
+            state = self._users.get(user_id)
+            deadline = state.tasks.get(task_id) if state else None
+            if deadline is None:
+                continue
+            if deadline.due_date < now:
+                # Past due: no longer ongoing-and-upcoming
+                state.tasks.pop(task_id, None)
+                for bucket in state.buckets.values():
+                    bucket.pop(task_id, None)
+            else:
+                bucket = self._place(state, deadline, now)
+                if bucket:
+                    entered.append((bucket, deadline))
+        return entered
+
+    def advance(self, now: Optional[datetime] = None) -> None:
+        now = now or current_time()
+        with self._lock:
+            entered = self._advance(now)
+        self._notify(entered)
+
+    async def run(self, interval_seconds: float = 30.0) -> None:
+        # Background tick so reminder listeners fire even when nobody polls /tasks/grouped;
+        # it runs in a thread so the lock and the listeners never block the event loop
+        while True:
+            try:
+                await asyncio.to_thread(self.advance)
+            except Exception:
+                logger.exception("Deadline scheduler tick failed")
+            await asyncio.sleep(interval_seconds)
+
+    # ------------------- Reminders ------------------- #
+    def add_listener(self, callback: Callable[[str, TaskDeadline], None]) -> None:
+        self._listeners.append(callback)
+
+    def _notify(self, entered: List[Tuple[str, TaskDeadline]]) -> None:
+        # Called without the lock held, since listeners may publish to the database
+        for bucket, deadline in entered:
+            for callback in self._listeners:
+                try:
+                    callback(bucket, deadline)
+                except Exception:
+                    logger.exception("Deadline listener failed")
+
+    # ------------------- Reading ------------------- #
+    def grouped(self, db: Session, user_id: int, ongoing_status_id: int,
+                version: Optional[int] = None) -> Dict[str, List[TaskDeadline]]:
+        # `version` is the user's current data version: a write through any worker process
+        # changes it, so the user is reloaded right away instead of on the periodic timer
+        now = current_time()
+        with self._lock:
+            state = self._users.get(user_id)
+            stale = (
+                state is None
+                or (version is not None and state.version != version)
+                or time.monotonic() - state.loaded_at > self.reload_seconds
+            )
+        deadlines = self._fetch_user(db, user_id, ongoing_status_id, now) if stale else None
+        with self._lock:
+            if deadlines is not None:
+                self._install_user(user_id, deadlines, now, version)
+            entered = self._advance(now)
+            state = self._users[user_id]
+            self._users.move_to_end(user_id)
+            grouped = {
+                name: sorted(bucket.values(), key=lambda deadline: (deadline.due_date, deadline.task_id))
+                for name, bucket in state.buckets.items()
+            }
+        self._notify(entered)
+        return grouped
+
+
+deadline_scheduler = DeadlineScheduler(reload_seconds=DEADLINE_RELOAD_SECONDS, max_users=DEADLINE_MAX_USERS)
@@ -1,8 +1,9 @@
-from utils.database import SessionLocal
+from utils.database import SessionLocal, AsyncSessionLocal
 from typing import Annotated, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, status
-from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 from utils.models import User as UserModel
 from pydantic import BaseModel
@@ -10,6 +11,7 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime
 from utils.jwt_bearer import JWTBearer
+from utils.principal_cache import principal_cache
 
 # ---------------- Load Environment ----------------- #
 load_dotenv()
@@ -41,41 +43,64 @@ def get_db():
 
 db_dependency = Annotated[Session, Depends(get_db)]
 
+# ------------------ Get Async Database Dependency -------------------- #
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
 # -------------------- JWTBearer -------------------- #
 jwt_bearer = JWTBearer()
 
 # -------------------- Get Current User ---------------------- #
+async def load_auth_user(db: AsyncSession, email: str) -> Optional[AuthUser]:
+    # Repeat requests are served from the principal cache without touching the database
+    generation = principal_cache.generation
+    cached_user = principal_cache.get(email)
+    if cached_user is not None:
+        return cached_user
+
+    # Retrieve the user from the database based on the email
+    result = await db.execute(select(UserModel).where(UserModel.email == email))
+    user = result.scalars().first()
+    if user is None:
+        return None
+
+    auth_user = AuthUser(
+        user_id=user.user_id,
+        username=user.username,
+        email=user.email,
+        created_at=user.created_at,
+        is_active=user.is_active,
+        is_admin=user.is_admin
+    )
+    principal_cache.set(email, auth_user, generation)
+    return auth_user
+
 async def get_current_user(
-    token: Annotated[str, Depends(jwt_bearer)],  # Ensure jwt_bearer extracts the token
-    db: db_dependency
+    payload: Annotated[dict, Depends(jwt_bearer)],  # Claims already verified by jwt_bearer
+    db: async_db_dependency
 ) -> AuthUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        # Decode the JWT token
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")  # Extract the 'sub' claim from the payload (now contains email)
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError as e:
-        print(f"JWTError: {e}")  # Debugging log
+    email: str = payload.get("sub")  # Extract the 'sub' claim from the payload (now contains email)
+    if email is None:
         raise credentials_exception
+    token_data = TokenData(email=email)
 
-    # Retrieve the user from the database based on the email
-    user = db.query(UserModel).filter(UserModel.email == token_data.email).first()
-    if user is None:
+    auth_user = await load_auth_user(db, token_data.email)
+    if auth_user is None:
         raise credentials_exception
+    return auth_user
 
-    # Return the AuthUser schema
-    return AuthUser(
-        user_id=user.user_id,
-        username=user.username,
-        email=user.email,
-        created_at=user.created_at,
-        is_active=user.is_active,
-        is_admin=user.is_admin
-    )
\ No newline at end of file
+# -------------------- Admin Only ---------------------- #
+async def get_current_admin(
+    current_user: Annotated[AuthUser, Depends(get_current_user)]
+) -> AuthUser:
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return current_user
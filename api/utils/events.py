@@ -0,0 +1,186 @@
+import asyncio
+import itertools
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Set
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from utils.database import engine
+from utils.settings import EVENT_BROKER, EVENT_HEARTBEAT_SECONDS, EVENT_QUEUE_SIZE, POSTGRES_ASYNC_URL
+
+logger = logging.getLogger(__name__)
+
+TASK_CREATED = "task-created"
+TASK_STATUS_CHANGED = "task-status-changed"
+TASK_DUE_SOON = "task-due-soon"
+# Batched events from the bulk endpoints, one per user per request
+TASKS_CREATED = "tasks-created"
+TASKS_STATUS_CHANGED = "tasks-status-changed"
+# Sent to a subscriber that fell behind; the client should refetch instead of applying deltas
+RESYNC = "resync"
+
+
+class Subscription:
+    def __init__(self, user_id: int, maxsize: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def offer(self, event: dict) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Backpressure: a slow client loses its backlog and is told to resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": RESYNC})
+
+
+class EventBroker:
+    """Per-user fan-out of task events. publish() may be called from any thread."""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ids = itertools.count(1)
+
+    async def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        pass
+
+    def subscribe(self, user_id: int) -> Subscription:
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers:
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.user_id]
+
+    def _deliver(self, user_id: int, event: dict) -> None:
+        for subscription in list(self._subscribers.get(user_id, ())):
+            subscription.offer(event)
+
+    def deliver_local(self, user_id: int, event: dict) -> None:
+        if self._loop is None or user_id not in self._subscribers:
+            return
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._deliver(user_id, event)
+                return
+        except RuntimeError:
+            pass  # Called from a threadpool worker (sync def handler)
+        self._loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+    def publish(self, user_id: int, event_type: str, data: dict) -> None:
+        self.deliver_local(user_id, {"id": next(self._ids), "type": event_type, "data": jsonable_encoder(data)})
+
+
+class PostgresNotifyBroker(EventBroker):
+    """
+    Cross-worker broker on Postgres LISTEN/NOTIFY: events are published with pg_notify and
+    every worker's listener fans them out to its own local subscribers. The pg_notify runs on
+    a sync connection, so when publish() is called on the event loop it is handed to a single
+    thread, which also keeps those events in order.
+    """
+
+    CHANNEL = "task_events"
+    # NOTIFY payloads are capped at 8000 bytes; larger events are sent without their body
+    MAX_PAYLOAD = 7900
+
+    def __init__(self, queue_size: int):
+        super().__init__(queue_size)
+        self._connection = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pg-notify")
+
+    async def start(self) -> None:
+        # Safe to call again (warm-up retries): a listening connection is kept, and one that
+        # failed to start listening is closed instead of leaked
+        import asyncpg
+
+        await super().start()
+        if self._connection is not None:
+            return
+        url = make_url(POSTGRES_ASYNC_URL)
+        connection = await asyncpg.connect(
+            user=url.username, password=url.password, host=url.host, port=url.port, database=url.database
+        )
+        try:
+            await connection.add_listener(self.CHANNEL, self._on_notify)
+        except BaseException:
+            await connection.close()
+            raise
+        self._connection = connection
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        message = json.loads(payload)
+        self._deliver(message["user_id"], message["event"])
+
+    def publish(self, user_id: int, event_type: str, data: dict) -> None:
+        event = {"id": next(self._ids), "type": event_type, "data": jsonable_encoder(data)}
+        payload = json.dumps({"user_id": user_id, "event": event}, separators=(",", ":"))
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            event = {"id": event["id"], "type": event_type, "data": {"task_id": data.get("task_id")}}
+            payload = json.dumps({"user_id": user_id, "event": event}, separators=(",", ":"))
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Called from a threadpool worker (sync def handler), which may block
+            self._send(user_id, event, payload)
+        else:
+            self._executor.submit(self._send, user_id, event, payload)
+
+    def _send(self, user_id: int, event: dict, payload: str) -> None:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("SELECT pg_notify(:channel, :payload)"),
+                                   {"channel": self.CHANNEL, "payload": payload})
+        except Exception:
+            # Delivery is best effort; fall back to this worker's subscribers
+            logger.exception("pg_notify failed, delivering locally only")
+            self.deliver_local(user_id, event)
+
+
+def create_broker() -> EventBroker:
+    if EVENT_BROKER == "postgres":
+        return PostgresNotifyBroker(EVENT_QUEUE_SIZE)
+    return EventBroker(EVENT_QUEUE_SIZE)
+
+
+event_broker = create_broker()
+
+
+def format_sse(event: dict) -> str:
+    return f"id: {event.get('id', '')}\nevent: {event['type']}\ndata: {json.dumps(event.get('data', {}))}\n\n"
+
+async def sse_stream(subscription: Subscription, is_disconnected) -> AsyncIterator[str]:
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    break
+                # Comment line keeps proxies from closing an idle connection
+                yield ": heartbeat\n\n"
+                continue
+            yield format_sse(event)
+    finally:
+        event_broker.unsubscribe(subscription)
@@ -0,0 +1,9 @@
+from typing import Optional
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison as required for If-None-Match (RFC 9110, section 13.1.2)
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag.removeprefix("W/") for tag in if_none_match.split(","))
@@ -2,6 +2,7 @@ from fastapi import Request, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 from typing import Optional
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -10,11 +11,14 @@ load_dotenv()
 SECRET_KEY = os.getenv('AUTH_SECRET_KEY')
 ALGORITHM = os.getenv('AUTH_ALGORITHM')
 
+logger = logging.getLogger(__name__)
+
 class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
 
-    async def __call__(self, request: Request) -> Optional[str]:
+    # Returns the decoded claims so dependants don't have to decode the token a second time
+    async def __call__(self, request: Request) -> Optional[dict]:
         credentials: HTTPAuthorizationCredentials = await super(JWTBearer, self).__call__(request)
         if credentials:
             if not credentials.scheme == "Bearer":
@@ -23,7 +27,7 @@ class JWTBearer(HTTPBearer):
             payload = self.verify_jwt(token)
             if not payload:
                 raise HTTPException(status_code=403, detail="Invalid or expired token.")
-            return token  # Return the token for further processing
+            return payload
         else:
             raise HTTPException(status_code=403, detail="Invalid authorization code.")
 
@@ -34,5 +38,5 @@ class JWTBearer(HTTPBearer):
             # Optionally, you can add more validation (e.g., check token expiry)
             return payload  # Return the payload if token is valid
         except JWTError as e:
-            print(f"JWT decoding error: {e}")  # Log the error for debugging
+            logger.info("JWT decoding error: %s", e)
             return None
@@ -0,0 +1,119 @@
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from utils.database import dialect_insert
+from utils.hyperloglog import HyperLogLog
+from utils.models import Login_Daily_Sketch, Login_History, Login_Hourly_Count
+from utils.task_status import LOCAL_TIMEZONE
+
+# Daily/weekly/monthly active users are counted over the last 1/7/30 local days
+ACTIVE_WINDOWS = {"dau": 1, "wau": 7, "mau": 30}
+
+
+def local_day_hour(logged_at: datetime) -> Tuple[date, int]:
+    local = logged_at.astimezone(LOCAL_TIMEZONE)
+    return local.date(), local.hour
+
+
+# ------------------- Incremental maintenance ------------------- #
+# Called in the same transaction that writes the raw rows (see utils/login_writer.py)
+def record_login_analytics(connection: Connection, events: Iterable[Tuple[int, datetime]]) -> None:
+    sketches: Dict[date, HyperLogLog] = defaultdict(HyperLogLog)
+    logins: Counter = Counter()
+    hourly: Counter = Counter()
+    for user_id, logged_at in events:
+        day, hour = local_day_hour(logged_at)
+        sketches[day].add(user_id)
+        logins[day] += 1
+        hourly[(day, hour)] += 1
+    if not sketches:
+        return
+
+    insert = dialect_insert(connection.dialect.name)
+    sketch_table = Login_Daily_Sketch.__table__
+    for day, sketch in sketches.items():
+        # Ensure the row exists, then lock it; the merge happens here because register-wise max
+        # has no SQL equivalent on bytea
+        connection.execute(
+            insert(sketch_table)
+            .values(day=day, registers=HyperLogLog().to_bytes(), logins=0)
+            .on_conflict_do_nothing(index_elements=[sketch_table.c.day])
+        )
+        stored = connection.execute(
+            select(sketch_table.c.registers).where(sketch_table.c.day == day).with_for_update()
+        ).scalar_one()
+        merged = HyperLogLog(stored).merge(sketch)
+        connection.execute(
+            update(sketch_table)
+            .where(sketch_table.c.day == day)
+            .values(registers=merged.to_bytes(), logins=sketch_table.c.logins + logins[day])
+        )
+
+    hourly_table = Login_Hourly_Count.__table__
+    statement = insert(hourly_table).values(
+        [{"day": day, "hour": hour, "logins": count} for (day, hour), count in hourly.items()]
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=[hourly_table.c.day, hourly_table.c.hour],
+        set_={"logins": hourly_table.c.logins + statement.excluded.logins}
+    ))
+
+def rebuild_login_analytics(connection: Connection, chunk_size: int = 10000) -> int:
+    # One pass over the raw history, used to backfill the emptied analytics tables
+    result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(
+        select(Login_History.user_id, Login_History.logged_at)
+    )
+    total = 0
+    for chunk in result.partitions():
+        record_login_analytics(connection, chunk)
+        total += len(chunk)
+    return total
+
+
+# ------------------- Reads ------------------- #
+def load_sketches(db: Session, start: date, end: date) -> Dict[date, HyperLogLog]:
+    rows = db.execute(
+        select(Login_Daily_Sketch.day, Login_Daily_Sketch.registers)
+        .where(Login_Daily_Sketch.day >= start, Login_Daily_Sketch.day <= end)
+    ).all()
+    return {row.day: HyperLogLog(row.registers) for row in rows}
+
+def distinct_users(sketches: Dict[date, HyperLogLog], start: date, end: date) -> int:
+    merged = HyperLogLog()
+    for day, sketch in sketches.items():
+        if start <= day <= end:
+            merged.merge(sketch)
+    return merged.count()
+
+def login_analytics(db: Session, start: date, end: date) -> dict:
+    earliest = min(start, end - timedelta(days=max(ACTIVE_WINDOWS.values()) - 1))
+    sketches = load_sketches(db, earliest, end)
+
+    active = {
+        name: distinct_users(sketches, end - timedelta(days=days - 1), end)
+        for name, days in ACTIVE_WINDOWS.items()
+    }
+    logins = db.execute(
+        select(Login_Daily_Sketch.logins).where(Login_Daily_Sketch.day >= start, Login_Daily_Sketch.day <= end)
+    ).scalars().all()
+
+    heat: Counter = Counter()
+    hourly_rows = db.execute(
+        select(Login_Hourly_Count.day, Login_Hourly_Count.hour, Login_Hourly_Count.logins)
+        .where(Login_Hourly_Count.day >= start, Login_Hourly_Count.day <= end)
+    ).all()
+    for row in hourly_rows:
+        heat[(row.day.isoweekday(), row.hour)] += row.logins
+
+    return {
+        **active,
+        "distinct_users": distinct_users(sketches, start, end),
+        "logins": sum(logins),
+        "heat": heat,
+        "relative_error": HyperLogLog().relative_error,
+    }
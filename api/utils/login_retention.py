@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from utils.database import engine
+from utils.models import Login_Daily_Rollup
+from utils.partitions import drop_empty_partitions_before
+from utils.settings import (
+    LOGIN_COMPACTION_BATCH_SIZE, LOGIN_COMPACTION_INTERVAL_SECONDS, LOGIN_RAW_RETENTION_DAYS
+)
+from utils.task_status import LOCAL_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_try_advisory_lock, so one worker compacts at a time
+COMPACTION_LOCK_ID = 7_240_312
+
+# One batch: delete the oldest raw rows before the cutoff and fold them into the per-user
+# daily rollups, in a single statement. Days are local days, shifted by :utc_offset
+ROLLUP_BATCH_SQL = text("""
+WITH batch AS (
+    DELETE FROM login_history
+    WHERE (login_id, logged_at) IN (
+        SELECT login_id, logged_at FROM login_history
+        WHERE logged_at < :cutoff
+        ORDER BY logged_at
+        LIMIT :batch_size
+    )
+    RETURNING user_id, logged_at
+), grouped AS (
+    SELECT user_id, (logged_at AT TIME ZONE 'UTC' + :utc_offset)::date AS day,
+           count(*) AS logins, min(logged_at) AS first_login_at, max(logged_at) AS last_login_at
+    FROM batch
+    GROUP BY 1, 2
+), rolled AS (
+    INSERT INTO login_daily_rollups (user_id, day, logins, first_login_at, last_login_at)
+    SELECT user_id, day, logins, first_login_at, last_login_at FROM grouped
+    ON CONFLICT (user_id, day) DO UPDATE SET
+        logins = login_daily_rollups.logins + excluded.logins,
+        first_login_at = least(login_daily_rollups.first_login_at, excluded.first_login_at),
+        last_login_at = greatest(login_daily_rollups.last_login_at, excluded.last_login_at)
+)
+SELECT count(*) FROM batch
+""")
+
+
+def retention_cutoff(now: Optional[datetime] = None) -> datetime:
+    # Local midnight, so every rolled-up day is complete
+    now = now or datetime.now(timezone.utc)
+    day = now.astimezone(LOCAL_TIMEZONE).date() - timedelta(days=LOGIN_RAW_RETENTION_DAYS)
+    return datetime.combine(day, time(0), tzinfo=LOCAL_TIMEZONE)
+
+
+# ------------------- Compaction ------------------- #
+def compact_login_history(cutoff: Optional[datetime] = None, batch_size: int = LOGIN_COMPACTION_BATCH_SIZE) -> dict:
+    if engine.dialect.name != "postgresql":
+        return {"skipped": True}
+    cutoff = cutoff or retention_cutoff()
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        if not lock.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": COMPACTION_LOCK_ID}).scalar():
+            return {"skipped": True}
+        try:
+            moved = 0
+            while True:
+                # Short transactions: each batch commits on its own and locks few rows
+                with engine.begin() as connection:
+                    count = connection.execute(ROLLUP_BATCH_SQL, {
+                        "cutoff": cutoff, "batch_size": batch_size, "utc_offset": LOCAL_TIMEZONE.utcoffset(None)
+                    }).scalar()
+                moved += count
+                if count < batch_size:
+                    break
+            # Emptied months are dropped whole, which also returns their space without a VACUUM
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                dropped = drop_empty_partitions_before(connection, "login_history", cutoff)
+            if moved or dropped:
+                logger.info("Compacted %s login rows before %s, dropped partitions %s", moved, cutoff, dropped)
+            return {"skipped": False, "cutoff": cutoff, "rows_compacted": moved, "partitions_dropped": dropped}
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": COMPACTION_LOCK_ID})
+
+async def run_login_compaction() -> None:
+    while True:
+        try:
+            await asyncio.to_thread(compact_login_history)
+        except Exception:
+            logger.exception("Login history compaction failed")
+        await asyncio.sleep(LOGIN_COMPACTION_INTERVAL_SECONDS)
+
+
+# ------------------- Reads ------------------- #
+def rollup_page(db: Session, user_id: int, start: Optional[date], end: Optional[date],
+                before: Optional[date], limit: int) -> List[Login_Daily_Rollup]:
+    # A user's compacted days, newest first, within the local-day window [start, end]
+    query = db.query(Login_Daily_Rollup).filter(Login_Daily_Rollup.user_id == user_id)
+    if start:
+        query = query.filter(Login_Daily_Rollup.day >= start)
+    if end:
+        query = query.filter(Login_Daily_Rollup.day <= end)
+    if before:
+        query = query.filter(Login_Daily_Rollup.day < before)
+    return query.order_by(Login_Daily_Rollup.day.desc()).limit(limit).all()
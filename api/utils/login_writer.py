@@ -0,0 +1,195 @@
+import asyncio
+import io
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+
+from utils.database import engine
+from utils.login_analytics import record_login_analytics
+from utils.models import Login_History
+from utils.settings import (
+    LOGIN_BUFFER_MAX_EVENTS, LOGIN_COPY_THRESHOLD, LOGIN_FLUSH_BATCH_SIZE, LOGIN_FLUSH_INTERVAL_SECONDS
+)
+
+logger = logging.getLogger(__name__)
+
+# (user_id, logged_at, monotonic time the event was queued)
+LoginEvent = Tuple[int, datetime, float]
+
+# The database is unreachable or busy; the batch is retried as a whole on the next flush
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, PoolTimeoutError)
+
+
+class LoginHistoryWriter:
+    """
+    Write-behind buffer for login events. record() only appends to a bounded in-memory queue
+    (safe from the event loop and from threadpool handlers); a background task writes the queue
+    out as one multi-row INSERT (or COPY for large batches) every `interval_seconds`, or as soon
+    as `batch_size` events are waiting. A batch the database rejects (e.g. a foreign key
+    violation) is split in halves until the bad events are isolated; those are dropped.
+    """
+
+    def __init__(self, max_events: int, batch_size: int, interval_seconds: float, copy_threshold: int):
+        self.max_events = max_events
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.copy_threshold = copy_threshold
+        self._events: Deque[LoginEvent] = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        # Counters
+        self.recorded = 0
+        self.written = 0
+        self.dropped = 0
+        self.requeued = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.max_delay_seconds = 0.0
+
+    # ------------------- Producers ------------------- #
+    def record(self, user_id: int, logged_at: Optional[datetime] = None) -> bool:
+        logged_at = logged_at or datetime.now(timezone.utc)
+        with self._lock:
+            if len(self._events) >= self.max_events:
+                # Never make a login wait on the database; the event is counted and dropped
+                self.dropped += 1
+                return False
+            self._events.append((user_id, logged_at, time.monotonic()))
+            self.recorded += 1
+            full = len(self._events) >= self.batch_size
+        if full:
+            self._wake()
+        return True
+
+    def _wake(self) -> None:
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            if asyncio.get_running_loop() is self._loop:
+                self._wakeup.set()
+                return
+        except RuntimeError:
+            pass  # Called from a threadpool worker (sync def handler)
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    # ------------------- Flushing ------------------- #
+    def _take(self) -> List[LoginEvent]:
+        with self._lock:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def _requeue(self, events: List[LoginEvent]) -> None:
+        # Failed batches go back to the front, oldest first, as far as capacity allows
+        with self._lock:
+            room = self.max_events - len(self._events)
+            kept = events[:max(room, 0)]
+            self._events.extendleft(reversed(kept))
+            self.requeued += len(kept)
+            self.dropped += len(events) - len(kept)
+
+    def _write(self, events: List[LoginEvent]) -> None:
+        with engine.begin() as connection:
+            if connection.dialect.name == "postgresql" and len(events) >= self.copy_threshold:
+                buffer = io.StringIO("".join(f"{user_id}\t{logged_at.isoformat()}\n" for user_id, logged_at, _ in events))
+                with connection.connection.cursor() as cursor:
+                    cursor.copy_expert("COPY login_history (user_id, logged_at) FROM STDIN", buffer)
+            else:
+                connection.execute(
+                    insert(Login_History),
+                    [{"user_id": user_id, "logged_at": logged_at} for user_id, logged_at, _ in events]
+                )
+            # Active-user sketches and hourly counts commit together with the raw rows
+            record_login_analytics(connection, [(user_id, logged_at) for user_id, logged_at, _ in events])
+
+    def flush(self) -> int:
+        # Serialized, so a shutdown flush never overlaps a background one
+        with self._flush_lock:
+            events = self._take()
+            if not events:
+                return 0
+            written = 0
+            # Batches still to write, the next one last
+            batches = [events]
+            while batches:
+                batch = batches.pop()
+                try:
+                    self._write(batch)
+                except TRANSIENT_ERRORS:
+                    self.failed_flushes += 1
+                    unwritten = [event for pending in [batch, *reversed(batches)] for event in pending]
+                    logger.exception("Writing %s login events failed; requeueing", len(unwritten))
+                    self._requeue(unwritten)
+                    break
+                except Exception as error:
+                    if len(batch) == 1:
+                        self.rejected += 1
+                        logger.warning("Dropping login event for user %s: %s", batch[0][0], error)
+                    else:
+                        middle = len(batch) // 2
+                        batches += [batch[middle:], batch[:middle]]
+                    continue
+                written += len(batch)
+            if written:
+                self.flushes += 1
+                self.written += written
+                self.max_delay_seconds = max(self.max_delay_seconds, time.monotonic() - events[0][2])
+            return written
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self.flush)
+
+    # ------------------- Lifecycle ------------------- #
+    def start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Whatever is still buffered is written before the worker exits
+        await asyncio.to_thread(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._events)
+            oldest = time.monotonic() - self._events[0][2] if self._events else 0.0
+        return {
+            "pending": pending,
+            "oldest_pending_seconds": round(oldest, 3),
+            "recorded": self.recorded,
+            "written": self.written,
+            "dropped": self.dropped,
+            "requeued": self.requeued,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "max_delay_seconds": round(self.max_delay_seconds, 3),
+        }
+
+
+login_writer = LoginHistoryWriter(
+    max_events=LOGIN_BUFFER_MAX_EVENTS,
+    batch_size=LOGIN_FLUSH_BATCH_SIZE,
+    interval_seconds=LOGIN_FLUSH_INTERVAL_SECONDS,
+    copy_threshold=LOGIN_COPY_THRESHOLD,
+)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+from typing import Annotated, List, Optional
+
+from fastapi import Depends, Request, Response
+from sqlalchemy.orm import Session
+
+from utils.deps import db_dependency
+from utils.http_cache import etag_matches
+from utils.models import Category, Priority, Status, Weekday
+from utils.settings import LOOKUP_CACHE_TTL_SECONDS
+
+# ------------------- Lookup tables ------------------- #
+class LookupTable:
+    """Immutable copy of one lookup table with O(1) indexes by id and by name."""
+
+    def __init__(self, rows: List[dict], id_field: str, name_field: str = "name"):
+        self._rows = rows
+        self._name_field = name_field
+        self._by_id = {row[id_field]: SimpleNamespace(**row) for row in rows}
+        self._by_name = {row[name_field].lower(): self._by_id[row[id_field]] for row in rows}
+        # Serialized once per load so the HTTP endpoints can answer without re-encoding
+        self.body = json.dumps(rows, separators=(",", ":")).encode()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+    def __iter__(self):
+        return iter(self._by_id.values())
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, row_id: Optional[int]) -> Optional[SimpleNamespace]:
+        return self._by_id.get(row_id)
+
+    def find(self, name: str) -> Optional[SimpleNamespace]:
+        return self._by_name.get(name.lower())
+
+    def name_of(self, row_id: Optional[int]) -> Optional[str]:
+        row = self._by_id.get(row_id)
+        return getattr(row, self._name_field) if row else None
+
+
+class LookupSnapshot:
+    def __init__(self, version: int, categories: LookupTable, priorities: LookupTable,
+                 statuses: LookupTable, weekdays: LookupTable):
+        self.version = version
+        self.categories = categories
+        self.priorities = priorities
+        self.statuses = statuses
+        self.weekdays = weekdays
+
+
+# ------------------- Registry ------------------- #
+class LookupRegistry:
+    """Process-wide cache of the lookup tables, reloaded on invalidate() or after the TTL."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._snapshot: Optional[LookupSnapshot] = None
+        self._loaded_at = 0.0
+        self._version = 0
+
+    def _expired(self) -> bool:
+        return self.ttl_seconds > 0 and time.monotonic() - self._loaded_at > self.ttl_seconds
+
+    def get(self, db: Session) -> LookupSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and not self._expired():
+            return snapshot
+        with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if self._snapshot is None or self._expired():
+                self._snapshot = self._load(db)
+                self._loaded_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    def _load(self, db: Session) -> LookupSnapshot:
+        categories = [
+            {"category_id": c.category_id, "name": c.name, "description": c.description}
+            for c in db.query(Category).order_by(Category.category_id)
+        ]
+        priorities = [
+            {"priority_id": p.priority_id, "name": p.name}
+            for p in db.query(Priority).order_by(Priority.priority_id)
+        ]
+        statuses = [
+            {"status_id": s.status_id, "name": s.name}
+            for s in db.query(Status).order_by(Status.status_id)
+        ]
+        weekdays = [
+            {"weekday_id": w.weekday_id, "weekday_name": w.weekday_name}
+            for w in db.query(Weekday).order_by(Weekday.weekday_id)
+        ]
+        self._version += 1
+        return LookupSnapshot(
+            version=self._version,
+            categories=LookupTable(categories, "category_id"),
+            priorities=LookupTable(priorities, "priority_id"),
+            statuses=LookupTable(statuses, "status_id"),
+            weekdays=LookupTable(weekdays, "weekday_id", name_field="weekday_name"),
+        )
+
+
+lookup_registry = LookupRegistry(ttl_seconds=LOOKUP_CACHE_TTL_SECONDS)
+
+def get_lookups(db: db_dependency) -> LookupSnapshot:
+    return lookup_registry.get(db)
+
+lookup_dependency = Annotated[LookupSnapshot, Depends(get_lookups)]
+
+
+# ------------------- HTTP caching ------------------- #
+LOOKUP_CACHE_CONTROL = "public, max-age=60, must-revalidate"
+
+def cached_table_response(request: Request, table: LookupTable) -> Response:
+    headers = {"ETag": table.etag, "Cache-Control": LOOKUP_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), table.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=table.body, media_type="application/json", headers=headers)
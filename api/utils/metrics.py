@@ -0,0 +1,213 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.settings import N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (s) of the request latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS_SECONDS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Label used for requests that matched no route, so unknown paths can't grow the label set
+UNMATCHED_ROUTE = "unmatched"
+
+
+# ------------------- Per-request SQL stats ------------------- #
+# Statements the profiler keeps per request; later ones are only counted
+MAX_PROFILE_STATEMENTS = 1000
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    selects: Counter = field(default_factory=Counter)
+    # Set to a list by the profiler to keep each statement and its duration, up to MAX_PROFILE_STATEMENTS
+    statement_log: Optional[List[Tuple[str, float]]] = None
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        if self.statement_log is not None and len(self.statement_log) < MAX_PROFILE_STATEMENTS:
+            self.statement_log.append((statement, seconds))
+        if statement.lstrip()[:6].upper() == "SELECT":
+            self.selects[statement] += 1
+
+    def repeated_selects(self) -> List[Tuple[str, int]]:
+        # The same parameterized SELECT issued over and over, e.g. a lazy load per row
+        return [(statement, count) for statement, count in self.selects.items() if count >= N_PLUS_ONE_THRESHOLD]
+
+# Set by MetricsMiddleware; sync handlers and streaming generators run in the threadpool with a
+# copy of the request's context, so they record into the same object
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+def instrument_engine(engine: Engine) -> None:
+    # For the async engine pass async_engine.sync_engine; its events run in the caller's context
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+# ------------------- Registry ------------------- #
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels: str) -> str:
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    """Request and SQL metrics of this worker, rendered in the Prometheus text format."""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_SECONDS):
+        self.buckets = list(buckets)
+        self._lock = threading.Lock()
+        self._latency_counts: Dict[Tuple[str, str, str], List[int]] = {}
+        self._latency_sum: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        self._in_flight = 0
+        self._statements: Counter = Counter()
+        self._db_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self._n_plus_one: Counter = Counter()
+
+    def request_started(self) -> None:
+        with self._lock:
+            self._in_flight += 1
+
+    def request_finished(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        key = (method, route, str(status))
+        repeated = stats.repeated_selects()
+        with self._lock:
+            self._in_flight -= 1
+            counts = self._latency_counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect_left(self.buckets, seconds)] += 1
+            self._latency_sum[key] += seconds
+            self._statements[(method, route)] += stats.statements
+            self._db_seconds[(method, route)] += stats.db_seconds
+            if repeated:
+                self._n_plus_one[(method, route)] += 1
+        for statement, count in repeated:
+            logger.warning("Likely N+1 in %s %s: statement ran %s times: %.200s", method, route, count, statement)
+
+    def render(self) -> str:
+        with self._lock:
+            latency_counts = {key: list(counts) for key, counts in self._latency_counts.items()}
+            latency_sum = dict(self._latency_sum)
+            in_flight = self._in_flight
+            statements = dict(self._statements)
+            db_seconds = dict(self._db_seconds)
+            n_plus_one = dict(self._n_plus_one)
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route template and status code.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), counts in sorted(latency_counts.items()):
+            running = 0
+            for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+                running += count
+                lines.append(f"http_request_duration_seconds_bucket{_labels(method=method, route=route, status=status, le=bound)} {running}")
+            labels = _labels(method=method, route=route, status=status)
+            lines.append(f"http_request_duration_seconds_sum{labels} {latency_sum[(method, route, status)]}")
+            lines.append(f"http_request_duration_seconds_count{labels} {running}")
+
+        lines += [
+            "# HELP http_requests_in_flight Requests currently being served.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+            "# HELP db_statements_total SQL statements executed while serving requests.",
+            "# TYPE db_statements_total counter",
+        ]
+        lines += [f"db_statements_total{_labels(method=m, route=r)} {n}" for (m, r), n in sorted(statements.items())]
+        lines += [
+            "# HELP db_time_seconds_total Time spent executing SQL while serving requests.",
+            "# TYPE db_time_seconds_total counter",
+        ]
+        lines += [f"db_time_seconds_total{_labels(method=m, route=r)} {s}" for (m, r), s in sorted(db_seconds.items())]
+        lines += [
+            "# HELP db_n_plus_one_requests_total Requests that repeated one SELECT at least N_PLUS_ONE_THRESHOLD times.",
+            "# TYPE db_n_plus_one_requests_total counter",
+        ]
+        lines += [f"db_n_plus_one_requests_total{_labels(method=m, route=r)} {n}" for (m, r), n in sorted(n_plus_one.items())]
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+def render_pool_waits(pools: Dict[str, object]) -> str:
+    # The checkout wait histograms kept by utils/db_pool.py, converted to seconds
+    lines = [
+        "# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.",
+        "# TYPE db_pool_checkout_wait_seconds histogram",
+    ]
+    for name, pool in pools.items():
+        if not hasattr(pool, "wait_histogram"):
+            continue
+        snapshot = pool.wait_histogram.snapshot()
+        for bound, count in snapshot["buckets_ms"].items():
+            le = bound if bound == "+Inf" else str(float(bound) / 1000)
+            lines.append(f"db_pool_checkout_wait_seconds_bucket{_labels(engine=name, le=le)} {count}")
+        lines.append(f"db_pool_checkout_wait_seconds_sum{_labels(engine=name)} {snapshot['sum_ms'] / 1000}")
+        lines.append(f"db_pool_checkout_wait_seconds_count{_labels(engine=name)} {snapshot['count']}")
+    return "\n".join(lines) + "\n"
+
+
+# ------------------- Middleware ------------------- #
+def route_template(scope: Scope) -> str:
+    # FastAPI puts the matched route in the scope, so paths like /algo/delete_user/{user_id} stay one label
+    route = scope.get("route")
+    return getattr(route, "path", UNMATCHED_ROUTE)
+
+def server_timing(seconds: float, stats: RequestStats) -> str:
+    return f'app;dur={seconds * 1000:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+
+class MetricsMiddleware:
+    """Times each HTTP request, counts its SQL, and adds a Server-Timing header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Streaming bodies keep running queries after this point; those show up in /metrics only
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(time.perf_counter() - started, stats))
+            await send(message)
+
+        metrics.request_started()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_request_stats.reset(token)
+            metrics.request_finished(scope["method"], route_template(scope), status, time.perf_counter() - started, stats)
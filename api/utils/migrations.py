@@ -0,0 +1,325 @@
+"""
+Versioned schema migrations.
+
+`create_all` only creates missing tables, so indexes added to utils/models.py never reach an
+existing database. Each migration below is applied once, in order, and recorded in the
+`schema_migrations` table. A fresh database is created from the models, which already hold
+every migration's result, so all versions are recorded without running them. Applied
+migrations are never edited; later changes go in a new migration.
+
+    python -m utils.migrations upgrade   # create missing tables, apply pending migrations
+    python -m utils.migrations check     # report pending migrations and missing indexes
+"""
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.engine import Connection, Engine
+
+from utils.database import Base, engine
+from utils import models  # registers the tables on Base.metadata
+from utils.login_analytics import rebuild_login_analytics
+from utils.partitions import ensure_monthly_partitions, is_partitioned
+from utils.settings import MIGRATION_WAIT_SECONDS, WARMUP_RETRY_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock so concurrent deploys do not race
+MIGRATION_LOCK_ID = 7_240_311
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    statements: Tuple[str, ...]
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    transactional: bool = True
+    # Python step run after the statements, for changes that depend on existing data
+    run: Optional[Callable[[Connection], None]] = None
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1,
+        "Task search and due-date indexes",
+        (
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_user_id_due_date ON tasks (user_id, due_date)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_search_tsv ON tasks USING gin "
+            "(to_tsvector('simple'::regconfig, coalesce(title, '') || ' ' || coalesce(description, '')))",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_title_trgm ON tasks USING gin (title gin_trgm_ops)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_description_trgm ON tasks USING gin "
+            "(description gin_trgm_ops)",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        2,
+        "Composite and partial indexes for hot query paths",
+        (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_user_id_status_id ON tasks (user_id, status_id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_ongoing_user_id_due_date ON tasks "
+            "(user_id, due_date) WHERE status_id = 1",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username_lower ON users (lower(username))",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_login_history_user_id ON login_history (user_id)",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        3,
+        "Login history as a month-partitioned timestamptz table",
+        (),
+        run=lambda connection: _partition_login_history(connection),
+    ),
+    Migration(
+        4,
+        "Backfill login analytics sketches from login history",
+        (),
+        run=lambda connection: _backfill_login_analytics(connection),
+    ),
+    Migration(
+        5,
+        "Admin user list ordering indexes",
+        (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_created_at_user_id ON users (created_at, user_id)",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_is_admin_user_id ON users (is_admin, user_id)",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        6,
+        "Task search document with title weighted above description",
+        (
+            # Built next to the old index, which is dropped only once the new one is ready
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_search_weighted_tsv ON tasks USING gin "
+            "((setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple'::regconfig, coalesce(description, '')), 'B')))",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_search_tsv",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        7,
+        "Deadline index on status instead of a partial index on a fixed status id",
+        (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tasks_user_id_status_id_due_date ON tasks "
+            "(user_id, status_id, due_date)",
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_tasks_ongoing_user_id_due_date",
+        ),
+        transactional=False,
+    ),
+    Migration(
+        8,
+        "Login history without a default partition",
+        (),
+        run=lambda connection: _drop_login_history_default(connection),
+    ),
+]
+
+
+# Migration 3: the per-field (time/day/month/year/weekday_id) table is rebuilt as a table
+# partitioned by month on a single logged_at timestamptz, and the rows are copied across.
+# The stored wall-clock fields are local time (UTC+7).
+def _partition_login_history(connection: Connection) -> None:
+    if is_partitioned(connection, "login_history"):
+        return  # Created partitioned from the models
+    for statement in (
+        "ALTER TABLE login_history RENAME TO login_history_legacy",
+        "ALTER INDEX IF EXISTS login_history_pkey RENAME TO login_history_legacy_pkey",
+        "ALTER INDEX IF EXISTS ix_login_history_user_id RENAME TO ix_login_history_legacy_user_id",
+        "ALTER SEQUENCE IF EXISTS login_history_login_id_seq RENAME TO login_history_legacy_login_id_seq",
+    ):
+        connection.execute(text(statement))
+
+    # Creating the table also creates its indexes and the upcoming monthly partitions
+    models.Login_History.__table__.create(connection)
+    bounds = connection.execute(text(
+        # A day of slack at the start: shifting local midnight to UTC can move a row into the previous month
+        "SELECT min(make_date(year, month, day)) - 1, max(make_date(year, month, day)) FROM login_history_legacy"
+    )).one()
+    if bounds[0] is not None:
+        ensure_monthly_partitions(connection, "login_history", bounds[0], bounds[1])
+
+    connection.execute(text(
+        "INSERT INTO login_history (login_id, user_id, logged_at) "
+        "SELECT login_id, user_id, "
+        "(make_date(year, month, day) + time - interval '7 hours') AT TIME ZONE 'UTC' "
+        "FROM login_history_legacy"
+    ))
+    connection.execute(text(
+        "SELECT setval(pg_get_serial_sequence('login_history', 'login_id'), "
+        "coalesce(max(login_id), 0) + 1, false) FROM login_history"
+    ))
+    connection.execute(text("DROP TABLE login_history_legacy"))
+
+
+# Migration 4: the analytics tables are maintained as logins are written; existing history is
+# folded in once. Workers may already have written some logins into them, so they are emptied
+# and rebuilt from the full history. TRUNCATE holds their lock until this transaction commits,
+# and a login written meanwhile adds its counts only after that, so none is counted twice.
+def _backfill_login_analytics(connection: Connection) -> None:
+    for model in (models.Login_Daily_Sketch, models.Login_Hourly_Count):
+        model.__table__.create(connection, checkfirst=True)
+    connection.execute(text("TRUNCATE login_daily_sketches, login_hourly_counts"))
+    rebuild_login_analytics(connection)
+
+
+# Migration 8: a default partition rules out DETACH PARTITION ... CONCURRENTLY, which retention
+# uses to drop emptied months on Postgres 14+. Rows it caught get their own monthly partitions first.
+def _drop_login_history_default(connection: Connection) -> None:
+    default = "login_history_default"
+    if not connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}).scalar():
+        return
+    bounds = connection.execute(text(
+        f"SELECT min(logged_at) AT TIME ZONE 'UTC', max(logged_at) AT TIME ZONE 'UTC' FROM {default}"
+    )).one()
+    if bounds[0] is not None:
+        ensure_monthly_partitions(connection, "login_history", bounds[0], bounds[1])
+    connection.execute(text(f"DROP TABLE {default}"))
+
+
+# ------------------- Version table ------------------- #
+def _ensure_version_table(connection: Connection) -> None:
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+def applied_versions(bind: Engine) -> List[int]:
+    if not inspect(bind).has_table("schema_migrations"):
+        return []
+    with bind.connect() as connection:
+        return list(connection.execute(text("SELECT version FROM schema_migrations ORDER BY version")).scalars())
+
+def pending_migrations(bind: Engine) -> List[Migration]:
+    if bind.dialect.name != "postgresql":
+        return []
+    applied = set(applied_versions(bind))
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+
+# ------------------- Upgrade ------------------- #
+def wait_for_database(bind: Engine = engine, timeout: float = MIGRATION_WAIT_SECONDS) -> None:
+    # Retries with exponential backoff, so a database that is still starting delays the upgrade
+    # (and the server started after it) instead of failing the container
+    deadline = time.monotonic() + timeout
+    delay = 0.5
+    while True:
+        try:
+            with bind.connect() as connection:
+                connection.execute(text("SELECT 1"))
+            return
+        except OperationalError as e:
+            if time.monotonic() + delay > deadline:
+                raise
+            logger.warning("Database unreachable (%s); retrying in %.1fs", e.orig, delay)
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+
+def _apply(bind: Engine, migration: Migration) -> None:
+    if migration.transactional:
+        with bind.begin() as connection:
+            _run(connection, migration)
+        return
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        _run(connection, migration)
+
+def _run(connection: Connection, migration: Migration) -> None:
+    for statement in migration.statements:
+        connection.execute(text(statement))
+    if migration.run is not None:
+        migration.run(connection)
+    _record(connection, migration)
+
+def _record(connection: Connection, migration: Migration) -> None:
+    connection.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+        {"version": migration.version, "description": migration.description}
+    )
+
+def upgrade(bind: Engine = engine) -> List[int]:
+    # Tables first, so a fresh database can be migrated before the app has ever started
+    fresh = not inspect(bind).has_table("users")
+    Base.metadata.create_all(bind=bind)
+    if bind.dialect.name != "postgresql":
+        # Migrations are written for Postgres; elsewhere create_all already built the declared indexes
+        return []
+
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as lock:
+        lock.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            with bind.begin() as connection:
+                _ensure_version_table(connection)
+            if fresh:
+                # Nothing to run, and some steps (migration 2's login_history index) do not
+                # apply to tables created from the current models
+                with bind.begin() as connection:
+                    for migration in pending_migrations(bind):
+                        _record(connection, migration)
+            applied = []
+            for migration in pending_migrations(bind):
+                logger.info("Applying migration %s: %s", migration.version, migration.description)
+                _apply(bind, migration)
+                applied.append(migration.version)
+            return applied
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+
+
+# ------------------- Schema check ------------------- #
+def _applies_to(index, dialect_name: str) -> bool:
+    ddl_if = getattr(index, "_ddl_if", None)
+    if ddl_if is None or ddl_if.dialect is None:
+        return True
+    if isinstance(ddl_if.dialect, str):
+        return ddl_if.dialect == dialect_name
+    return dialect_name in ddl_if.dialect
+
+def missing_indexes(bind: Engine = engine) -> Dict[str, List[str]]:
+    # Indexes declared on the models that the live database does not have, by table
+    inspector = inspect(bind)
+    missing: Dict[str, List[str]] = {}
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            missing[table.name] = ["<table missing>"]
+            continue
+        present = {index["name"] for index in inspector.get_indexes(table.name)}
+        names = sorted(
+            index.name for index in table.indexes
+            if _applies_to(index, bind.dialect.name) and index.name not in present
+        )
+        if names:
+            missing[table.name] = names
+    return missing
+
+def check(bind: Engine = engine) -> bool:
+    ok = True
+    for migration in pending_migrations(bind):
+        ok = False
+        print(f"pending migration {migration.version}: {migration.description}")
+    for table, names in missing_indexes(bind).items():
+        ok = False
+        for name in names:
+            print(f"missing index on {table}: {name}")
+    if ok:
+        print("schema up to date")
+    return ok
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "upgrade":
+        wait_for_database()
+        print(f"applied migrations: {upgrade() or 'none'}")
+    elif command == "check":
+        sys.exit(0 if check() else 1)
+    else:
+        sys.exit(f"unknown command {command!r}; expected 'upgrade' or 'check'")
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP, ForeignKey, Boolean, Time, Text
+from sqlalchemy import BigInteger, Column, Date, Integer, LargeBinary, SmallInteger, String, TIMESTAMP, ForeignKey, Boolean, Time, Text, Index, event, func, literal_column, text
 from utils.database import Base
+from utils.partitions import ensure_upcoming_partitions
 import datetime 
 from sqlalchemy.orm import relationship
 
@@ -16,27 +17,74 @@ class User(Base):
     login_history = relationship("Login_History", back_populates="user", cascade="all, delete-orphan")
     tasks = relationship("Task", back_populates="user",cascade="all, delete-orphan")
 
+# Case-insensitive username lookups (admin user search)
+Index("ix_users_username_lower", func.lower(User.username))
+# Keyset pagination of the admin user list by creation date / admin flag
+Index("ix_users_created_at_user_id", User.created_at, User.user_id)
+Index("ix_users_is_admin_user_id", User.is_admin, User.user_id)
+
 
 class Login_History(Base):
     __tablename__ = 'login_history'
-    login_id = Column(Integer, primary_key=True, autoincrement=True)
+    # One row per login event. Partitioned by month on logged_at (Postgres), so the partition
+    # key has to be part of the primary key.
+    login_id = Column(BigInteger, primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey('users.user_id'), nullable=False)
-    time = Column(Time, nullable=False)
-    day = Column(Integer, nullable=False)
-    month = Column(Integer, nullable=False)
-    year = Column(Integer, nullable=False)
-    weekday_id = Column(Integer, ForeignKey('weekday.weekday_id'), nullable=False)
-    
+    logged_at = Column(TIMESTAMP(timezone=True), primary_key=True, nullable=False)
+
     user = relationship("User", back_populates="login_history")
-    weekday = relationship("Weekday", back_populates="login_histories")
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (logged_at)"}
+
+# Per-user history in time order
+Index("ix_login_history_user_id_logged_at", Login_History.user_id, Login_History.logged_at)
+# Rows arrive in logged_at order, so a BRIN index serves time-window scans at a tiny size
+Index("ix_login_history_logged_at_brin", Login_History.logged_at, postgresql_using="brin").ddl_if(dialect="postgresql")
+
+@event.listens_for(Login_History.__table__, "after_create")
+def create_login_history_partitions(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        ensure_upcoming_partitions(connection, target.name)
+
+
+# Bumped by every task write for the user; keys the ETags and response cache of task reads
+# (utils/data_version.py)
+class User_Data_Version(Base):
+    __tablename__ = 'user_data_versions'
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+# Per-user daily totals that raw login_history rows are compacted into once they pass the
+# retention age (utils/login_retention.py)
+class Login_Daily_Rollup(Base):
+    __tablename__ = 'login_daily_rollups'
+    user_id = Column(Integer, ForeignKey('users.user_id', ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # Local (UTC+7) day
+    logins = Column(Integer, nullable=False)
+    first_login_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    last_login_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+
+# Incrementally maintained login analytics (utils/login_analytics.py), one row per local (UTC+7) day
+class Login_Daily_Sketch(Base):
+    __tablename__ = 'login_daily_sketches'
+    day = Column(Date, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)  # HyperLogLog registers of the day's user ids
+    logins = Column(BigInteger, nullable=False, default=0)
+
+
+class Login_Hourly_Count(Base):
+    __tablename__ = 'login_hourly_counts'
+    day = Column(Date, primary_key=True)
+    hour = Column(SmallInteger, primary_key=True)
+    logins = Column(BigInteger, nullable=False, default=0)
 
 
 class Weekday(Base):
     __tablename__ = 'weekday'
     weekday_id = Column(Integer, primary_key=True, autoincrement=True)
     weekday_name = Column(String(10), nullable=False, unique=True)
-    
-    login_histories = relationship("Login_History", back_populates="weekday")
 
 
 class Category(Base):
@@ -87,6 +135,44 @@ class Task(Base):
     status = relationship("Status", back_populates="tasks")
     tags = relationship("TaskTag", back_populates="task")
 
+
+# Range scans of a user's tasks by due date (calendar window, deadline buckets)
+Index("ix_tasks_user_id_due_date", Task.user_id, Task.due_date)
+# Per-user status filters (task list, dashboard counts)
+Index("ix_tasks_user_id_status_id", Task.user_id, Task.status_id)
+
+# A user's tasks in one status by due date (deadline scheduler reloads of ongoing tasks).
+# Not partial on the ongoing status, whose id is only known from the statuses table
+Index("ix_tasks_user_id_status_id_due_date", Task.user_id, Task.status_id, Task.due_date)
+
+
+# Full-text and trigram search indexes on tasks (Postgres only, see utils/task_search.py)
+TS_CONFIG = literal_column("'simple'::regconfig")
+# Title terms are weighted A and description terms B, so ts_rank ranks title matches higher
+task_search_document = func.setweight(
+    func.to_tsvector(TS_CONFIG, func.coalesce(Task.title, "")), literal_column("'A'")
+).op("||")(
+    func.setweight(func.to_tsvector(TS_CONFIG, func.coalesce(Task.description, "")), literal_column("'B'"))
+)
+
+# The table is named explicitly: the regconfig literal column keeps it from being inferred
+Index(
+    "ix_tasks_search_weighted_tsv", task_search_document, postgresql_using="gin", _table=Task.__table__
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_tasks_title_trgm", Task.title,
+    postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_tasks_description_trgm", Task.description,
+    postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+).ddl_if(dialect="postgresql")
+
+@event.listens_for(Task.__table__, "before_create")
+def create_trgm_extension(target, connection, **kw):
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 class TaskTag(Base):
     __tablename__ = 'task_tags'
     task_id = Column(Integer, ForeignKey('tasks.task_id'), primary_key=True)
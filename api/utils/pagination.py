@@ -0,0 +1,84 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Mapping
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_, tuple_
+
+# Response headers used by the paginated list endpoints
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+MAX_PAGE_SIZE = 500
+
+
+def page_headers(headers: Mapping[str, str]) -> Dict[str, str]:
+    # The pagination headers set on a sub-response, for endpoints that return their own Response
+    return {name: headers[name] for name in (TOTAL_COUNT_HEADER, NEXT_CURSOR_HEADER) if name in headers}
+
+
+# ------------------- Cursor encoding ------------------- #
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(sort_key: str, reverse: bool, value: Any, last_id: int) -> str:
+    # Opaque cursor: the sort key/direction it was issued for, plus the last row's position
+    payload = {"k": sort_key, "r": reverse, "v": _encode_value(value), "id": last_id}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort_key: str, reverse: bool) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if payload["k"] != sort_key or payload["r"] != reverse:
+            raise ValueError("cursor issued for a different ordering")
+        return [_decode_value(payload["v"]), int(payload["id"])]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+# ------------------- Keyset helpers ------------------- #
+# Rows are ordered by (column IS NULL, column, tiebreak); NULLs go last ascending and
+# first when reversed, so the order is total even for nullable sort columns.
+def keyset_order(column, tiebreak, reverse: bool = False) -> list:
+    if reverse:
+        return [column.is_(None).desc(), column.desc(), tiebreak.desc()]
+    return [column.is_(None).asc(), column.asc(), tiebreak.asc()]
+
+def keyset_filter(column, tiebreak, value: Any, last_id: int, reverse: bool = False):
+    if not reverse:
+        if value is None:
+            return and_(column.is_(None), tiebreak > last_id)
+        return or_(
+            column > value,
+            and_(column == value, tiebreak > last_id),
+            column.is_(None),
+        )
+    if value is None:
+        return or_(and_(column.is_(None), tiebreak < last_id), column.isnot(None))
+    return or_(column < value, and_(column == value, tiebreak < last_id))
+
+# NOT NULL sort columns: a row-value comparison, which Postgres answers with a range scan
+# on a (column, tiebreak) index instead of the NULL-aware OR above
+def row_keyset_order(column, tiebreak, reverse: bool = False) -> list:
+    if reverse:
+        return [column.desc(), tiebreak.desc()]
+    return [column.asc(), tiebreak.asc()]
+
+def row_keyset_filter(column, tiebreak, value: Any, last_id: int, reverse: bool = False):
+    if reverse:
+        return tuple_(column, tiebreak) < tuple_(value, last_id)
+    return tuple_(column, tiebreak) > tuple_(value, last_id)
+
+def escape_like(term: str) -> str:
+    # Escape LIKE wildcards so user input is matched literally
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
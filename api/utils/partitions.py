@@ -0,0 +1,145 @@
+import asyncio
+import logging
+from datetime import date, datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from utils.database import engine
+from utils.settings import PARTITION_MAINTENANCE_SECONDS, PARTITION_MONTHS_AHEAD
+
+logger = logging.getLogger(__name__)
+
+# Tables partitioned by month on a timestamptz column (RANGE partitioning, Postgres only)
+MONTHLY_PARTITIONED_TABLES = ["login_history"]
+# server_version_num from which partitions can be detached without blocking the parent
+CONCURRENT_DETACH_VERSION = 140000
+
+
+# ------------------- Month ranges ------------------- #
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month.year:04d}_{month.month:02d}"
+
+def months_between(start: datetime, end: datetime) -> List[date]:
+    months, month = [], month_start(start)
+    while month <= month_start(end):
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+# ------------------- DDL ------------------- #
+def is_partitioned(connection: Connection, table: str) -> bool:
+    relkind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:table)"), {"table": table}
+    ).scalar()
+    return relkind == "p"
+
+def partition_column(connection: Connection, table: str) -> str:
+    return connection.execute(text(
+        "SELECT a.attname FROM pg_partitioned_table p "
+        "JOIN pg_attribute a ON a.attrelid = p.partrelid AND a.attnum = p.partattrs[0] "
+        "WHERE p.partrelid = to_regclass(:table)"
+    ), {"table": table}).scalar_one()
+
+def _create_month_partition(connection: Connection, table: str, name: str, lower: str, upper: str) -> None:
+    bounds = f"FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    default = f"{table}_default"
+    column = partition_column(connection, table)
+    in_range = f"{column} >= '{lower}' AND {column} < '{upper}'"
+    stragglers = (
+        connection.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": default}).scalar()
+        and connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE {in_range})")).scalar()
+    )
+    if not stragglers:
+        connection.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} {bounds}"))
+        return
+    # Postgres refuses a partition whose range holds rows in the default partition, so the
+    # month's rows are moved into a plain table that is then attached as the partition.
+    # Only tables created before default partitions were dropped (migration 8) still have one.
+    logger.warning("Moving rows for %s out of %s", name, default)
+    connection.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    connection.execute(text(
+        f"WITH moved AS (DELETE FROM {default} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    connection.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds}"))
+
+def ensure_monthly_partitions(connection: Connection, table: str, start: datetime, end: datetime) -> List[str]:
+    # One partition per UTC calendar month in [start, end]; existing partitions are left alone
+    created = []
+    for month in months_between(start, end):
+        name = partition_name(table, month)
+        if connection.execute(text("SELECT to_regclass(:name) IS NULL"), {"name": name}).scalar():
+            lower, upper = f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"
+            _create_month_partition(connection, table, name, lower, upper)
+        created.append(name)
+    return created
+
+def ensure_upcoming_partitions(connection: Connection, table: str, now: Optional[datetime] = None) -> List[str]:
+    # There is no default partition (on Postgres 14+ it would rule out DETACH ... CONCURRENTLY),
+    # so the current month and PARTITION_MONTHS_AHEAD more must exist before rows arrive for them
+    now = now or datetime.now(timezone.utc)
+    ahead = add_months(month_start(now), PARTITION_MONTHS_AHEAD)
+    return ensure_monthly_partitions(connection, table, now, datetime(ahead.year, ahead.month, 1))
+
+def supports_concurrent_detach(connection: Connection) -> bool:
+    # DETACH PARTITION ... CONCURRENTLY and pg_inherits.inhdetachpending arrived in Postgres 14
+    return int(connection.execute(text("SHOW server_version_num")).scalar()) >= CONCURRENT_DETACH_VERSION
+
+def drop_empty_partitions_before(connection: Connection, table: str, cutoff: datetime) -> List[str]:
+    # Monthly partitions that end at or before `cutoff` and hold no rows any more. On Postgres 14+
+    # each one is detached CONCURRENTLY first, so reads and writes of the parent are never blocked
+    # behind an ACCESS EXCLUSIVE lock; that cannot run in a transaction block, so `connection` must
+    # be in AUTOCOMMIT. A detach interrupted half way is finished with FINALIZE on the next run.
+    # Older servers detach with the brief ACCESS EXCLUSIVE lock of a plain DETACH PARTITION.
+    concurrent = supports_concurrent_detach(connection)
+    pending = "i.inhdetachpending" if concurrent else "false"
+    partitions = connection.execute(text(
+        f"SELECT c.relname, {pending} FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).all()
+    dropped = []
+    for name, detach_pending in sorted(partitions):
+        suffix = name[len(table) + 1:]
+        try:
+            month = datetime.strptime(suffix, "%Y_%m").date()
+        except ValueError:
+            continue
+        upper = add_months(month, 1)
+        if datetime(upper.year, upper.month, 1, tzinfo=timezone.utc) > cutoff:
+            continue
+        if connection.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        mode = "FINALIZE" if detach_pending else "CONCURRENTLY" if concurrent else ""
+        connection.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name} {mode}".rstrip()))
+        connection.execute(text(f"DROP TABLE {name}"))
+        dropped.append(name)
+    return dropped
+
+
+# ------------------- Maintenance ------------------- #
+def maintain_partitions() -> None:
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as connection:
+        for table in MONTHLY_PARTITIONED_TABLES:
+            if is_partitioned(connection, table):
+                ensure_upcoming_partitions(connection, table)
+
+async def run_partition_maintenance() -> None:
+    # Keeps PARTITION_MONTHS_AHEAD months of empty partitions ready ahead of the write path
+    while True:
+        try:
+            await asyncio.to_thread(maintain_partitions)
+        except Exception:
+            logger.exception("Partition maintenance failed")
+        await asyncio.sleep(PARTITION_MAINTENANCE_SECONDS)
@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from utils.settings import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+
+# Pinning min/max rounds to the configured cost makes needs_update() flag any hash made with a
+# different cost, so it is transparently rehashed on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+async def _run_bounded(fn, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_HASH_MAX_PENDING:
+            # Fail fast instead of queueing behind a login storm
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication service is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+    finally:
+        with _pending_lock:
+            _pending -= 1
+
+
+async def hash_password(plain_password: str) -> str:
+    return await _run_bounded(pwd_context.hash, plain_password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    # Returns (valid, new_hash); new_hash is set when the stored hash should be replaced
+    return await _run_bounded(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+def hash_pool_status() -> dict:
+    # Jobs running or queued on the bcrypt pool, against the limit at which logins get a 503
+    return {"pending": _pending, "max_pending": PASSWORD_HASH_MAX_PENDING, "workers": PASSWORD_HASH_WORKERS}
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+from utils.settings import PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS
+
+V = TypeVar("V")
+
+
+class TTLCache(Generic[V]):
+    """
+    Bounded LRU cache whose entries also expire after ttl_seconds. on_evict, if given, is called
+    with (key, value) for every entry dropped by the LRU bound or by expiry.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float,
+                 on_evict: Optional[Callable[[Hashable, V], None]] = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at >= time.monotonic():
+                self._data.move_to_end(key)
+                return value
+            del self._data[key]
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+        return None
+
+    def set(self, key: Hashable, value: V) -> None:
+        evicted = []
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                evicted_key, (evicted_value, _) = self._data.popitem(last=False)
+                evicted.append((evicted_key, evicted_value))
+        if self.on_evict is not None:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class PrincipalCache:
+    """Authenticated users keyed by token subject (email), so repeat requests skip the users SELECT."""
+
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self._by_subject = TTLCache(maxsize, ttl_seconds, on_evict=self._forget)
+        self._subject_by_user_id: Dict[int, str] = {}
+        # Re-entrant: an LRU eviction inside set() calls back into _forget()
+        self._lock = threading.RLock()
+        # Bumped by every invalidation; set() drops principals read from the database before one
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, subject: str):
+        return self._by_subject.get(subject)
+
+    def set(self, subject: str, user, generation: int) -> None:
+        # `generation` is read before loading `user`, so a load that raced an invalidation is not cached
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._by_subject.set(subject, user)
+            self._subject_by_user_id[user.user_id] = subject
+
+    def _forget(self, subject: str, user) -> None:
+        # Evicted or expired entries take their reverse mapping with them
+        with self._lock:
+            if self._subject_by_user_id.get(user.user_id) == subject:
+                del self._subject_by_user_id[user.user_id]
+
+    def invalidate_user(self, user_id: int) -> None:
+        # Called whenever a user row changes so a stale principal is never served
+        with self._lock:
+            self._generation += 1
+            subject = self._subject_by_user_id.pop(user_id, None)
+        if subject is not None:
+            self._by_subject.pop(subject)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._subject_by_user_id.clear()
+        self._by_subject.clear()
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
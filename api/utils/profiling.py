@@ -0,0 +1,267 @@
+import asyncio
+import html
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.database import AsyncSessionLocal
+from utils.deps import jwt_bearer, load_auth_user
+from utils.metrics import MAX_PROFILE_STATEMENTS, current_request_stats, route_template
+from utils.settings import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_KEEP, PROFILE_SAMPLE_PERCENT
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_ID_PATTERN = re.compile(r"^\d{8}T\d{6}-[0-9a-f]{8}$")
+
+# Frames from files under the API source tree are what a profile is about
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILER_FILE = os.path.abspath(__file__)
+
+
+# ------------------- Stack sampler ------------------- #
+def frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(API_ROOT):
+        filename = os.path.relpath(filename, API_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+def is_app_frame(frame) -> bool:
+    filename = frame.f_code.co_filename
+    return filename.startswith(API_ROOT) and filename != PROFILER_FILE and "site-packages" not in filename
+
+class StackSampler:
+    """
+    Samples the stacks of every thread at a fixed interval and counts them in collapsed form
+    (`outer;...;inner count`). Only stacks running API code are kept: the event loop while a
+    handler executes, and threadpool workers running sync handlers, dependencies or streams.
+    Requests served concurrently with the profiled one can show up in its samples.
+    """
+
+    def __init__(self, interval_seconds: float):
+        self.interval = interval_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack, app_code = [], False
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    app_code = app_code or is_app_frame(frame)
+                    frame = frame.f_back
+                if app_code:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+
+# ------------------- Storage ------------------- #
+def new_profile_id() -> str:
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+def profile_path(profile_id: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{profile_id}.json")
+
+def store_profile(profile: dict) -> None:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    temporary = profile_path(profile["profile_id"]) + ".tmp"
+    with open(temporary, "w") as file:
+        json.dump(profile, file)
+    os.replace(temporary, profile_path(profile["profile_id"]))
+    # Ids sort by time, so the oldest files go first
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in names[:max(len(names) - PROFILE_KEEP, 0)]:
+        os.remove(os.path.join(PROFILE_DIR, name))
+
+def load_profile(profile_id: str) -> Optional[dict]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    try:
+        with open(profile_path(profile_id)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+def list_profiles(limit: int) -> List[dict]:
+    # Newest first, without the stacks and statements
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    summaries = []
+    for name in names[:limit]:
+        profile = load_profile(name[:-len(".json")])
+        if profile is not None:
+            summaries.append({key: value for key, value in profile.items() if key not in ("stacks", "sql")})
+    return summaries
+
+
+# ------------------- Rendering ------------------- #
+def collapsed_stacks(profile: dict) -> str:
+    # The input format of flamegraph.pl, speedscope and similar tools
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+def _stack_tree(stacks: Dict[str, int]) -> dict:
+    root = {"name": "all", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"name": name, "value": 0, "children": {}})
+            node["value"] += count
+    return root
+
+def _render_node(node: dict, total: int, parent_value: int, depth: int) -> str:
+    # Frames under 0.5% of all samples are left out to keep the page small
+    children = "".join(
+        _render_node(child, total, node["value"], depth + 1)
+        for child in sorted(node["children"].values(), key=lambda child: -child["value"])
+        if child["value"] * 200 >= total
+    )
+    title = html.escape(f"{node['name']}: {node['value']} samples ({node['value'] * 100 / total:.1f}%)")
+    return (
+        f'<div class="frame" style="width:{node["value"] * 100 / parent_value:.3f}%" title="{title}">'
+        f'<div class="label d{depth % 4}">{html.escape(node["name"])}</div>'
+        f'<div class="children">{children}</div></div>'
+    )
+
+def profile_html(profile: dict) -> str:
+    tree = _stack_tree(profile["stacks"])
+    graph = _render_node(tree, tree["value"], tree["value"], 0) if tree["value"] else "<p>No samples in API code.</p>"
+    statements = "".join(
+        f"<tr><td>{entry['duration_ms']:.2f}</td><td><code>{html.escape(entry['statement'])}</code></td></tr>"
+        for entry in profile["sql"]
+    )
+    title = html.escape(f"{profile['method']} {profile['path']}")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Profile {profile['profile_id']}: {title}</title>
+<style>
+body {{ font: 13px sans-serif; margin: 16px; }}
+.frame {{ box-sizing: border-box; overflow: hidden; }}
+.children {{ display: flex; }}
+.label {{ white-space: nowrap; overflow: hidden; text-overflow: ellipsis; padding: 2px 4px;
+          border: 1px solid #fff; font: 11px monospace; }}
+.d0 {{ background: #f8c471; }} .d1 {{ background: #f5b041; }} .d2 {{ background: #eb984e; }} .d3 {{ background: #f0b27a; }}
+table {{ border-collapse: collapse; margin-top: 16px; }}
+td {{ border-top: 1px solid #ddd; padding: 2px 8px; vertical-align: top; }}
+</style></head><body>
+<h2>{title}</h2>
+<p>route {html.escape(profile['route'])}, status {profile['status']}, {profile['duration_ms']:.1f} ms,
+{profile['samples']} samples every {profile['interval_ms']} ms, {profile['sql_statements']} SQL statements
+({profile['db_ms']:.1f} ms), started {profile['started_at']}</p>
+{graph}
+<table><tr><th>ms</th><th>SQL</th></tr>{statements}</table>
+</body></html>
+"""
+
+
+# ------------------- Middleware ------------------- #
+async def is_admin_request(scope: Scope) -> bool:
+    scheme, _, token = Headers(scope=scope).get("authorization", "").partition(" ")
+    if scheme != "Bearer" or not token:
+        return False
+    payload = jwt_bearer.verify_jwt(token)
+    if not payload or not payload.get("sub"):
+        return False
+    async with AsyncSessionLocal() as db:
+        user = await load_auth_user(db, payload["sub"])
+    return bool(user and user.is_admin)
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when an admin sends `X-Profile: 1`, or for PROFILE_SAMPLE_PERCENT of all
+    requests. The stored profile (stacks plus SQL) is named in the X-Profile-Id response header
+    and served by /internal/profiles. Must run inside MetricsMiddleware, which counts the SQL.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def _trigger(self, scope: Scope) -> Optional[str]:
+        if Headers(scope=scope).get(PROFILE_HEADER, "").lower() in ("1", "true"):
+            return "header" if await is_admin_request(scope) else None
+        if PROFILE_SAMPLE_PERCENT > 0 and random.random() * 100 < PROFILE_SAMPLE_PERCENT:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = await self._trigger(scope) if scope["type"] == "http" else None
+        stats = current_request_stats.get()
+        if trigger is None or stats is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        stats.statement_log = []
+        statements_before, db_seconds_before = stats.statements, stats.db_seconds
+        status = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        sampler = StackSampler(PROFILE_INTERVAL_MS / 1000)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            duration = time.perf_counter() - started
+            # Joining the sampler thread waits up to one interval, so not on the event loop
+            await asyncio.to_thread(sampler.stop)
+            profile = {
+                "profile_id": profile_id,
+                "trigger": trigger,
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": route_template(scope),
+                "status": status,
+                "started_at": started_at.isoformat(),
+                "duration_ms": duration * 1000,
+                "interval_ms": PROFILE_INTERVAL_MS,
+                "samples": sampler.samples,
+                "sql_statements": stats.statements - statements_before,
+                "db_ms": (stats.db_seconds - db_seconds_before) * 1000,
+                "stacks": dict(sampler.stacks),
+                # At most MAX_PROFILE_STATEMENTS, see RequestStats.record
+                "sql": [
+                    {"statement": statement, "duration_ms": seconds * 1000}
+                    for statement, seconds in stats.statement_log
+                ],
+            }
+            try:
+                await asyncio.to_thread(store_profile, profile)
+            except OSError:
+                logger.exception("Could not store profile %s", profile_id)
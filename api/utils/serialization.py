@@ -0,0 +1,26 @@
+from typing import Any, Mapping, Optional
+
+import orjson
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+
+# Same text as pydantic's JSON mode: ISO 8601 datetimes with 'Z' for UTC, raw UTF-8
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content: Any) -> bytes:
+    # Plain rows are written by orjson directly; anything it doesn't know (pydantic models,
+    # Decimal, ...) goes through FastAPI's encoder first
+    return orjson.dumps(content, default=jsonable_encoder, option=ORJSON_OPTIONS)
+
+
+# For list endpoints that build plain dicts from trusted database rows. Returning a Response
+# skips FastAPI's response_model validation, which stays on the route for the OpenAPI schema.
+class RowsResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, headers: Optional[Mapping[str, str]] = None, **kwargs):
+        super().__init__(content, headers=dict(headers) if headers else None, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
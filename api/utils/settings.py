@@ -7,4 +7,97 @@ load_dotenv()
 POSTGRES_USER = os.getenv("POSTGRES_USER", "")
 POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "")
 POSTGRES_DB = os.getenv("POSTGRES_DB", "")
-POSTGRES_URL: str = f'postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db/{POSTGRES_DB}'
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "db")
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+
+# DATABASE_URL / DATABASE_ASYNC_URL override the URLs built from the POSTGRES_* settings
+POSTGRES_URL: str = os.getenv(
+    "DATABASE_URL",
+    f'postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}'
+)
+POSTGRES_ASYNC_URL: str = os.getenv(
+    "DATABASE_ASYNC_URL",
+    f'postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}'
+)
+
+# Connection pool (per engine, per worker process). DB_POOL_SIZE must be at least 1 unless
+# DB_PGBOUNCER is set: SQLAlchemy treats a pool size of 0 as "no limit"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Running behind PgBouncer (transaction pooling): disables asyncpg prepared statement caches,
+# and with DB_POOL_SIZE=0 leaves all pooling to PgBouncer
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() in ("1", "true", "yes")
+
+
+# bcrypt cost factor; hashes made with another cost are rehashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads hashing passwords per worker, and how many hash jobs may wait before 503s are returned
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+# Authenticated principals cached per worker, keyed by token subject
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+# Seconds before the cached Category/Priority/Status/Weekday tables are reloaded (0 = never)
+LOOKUP_CACHE_TTL_SECONDS = float(os.getenv("LOOKUP_CACHE_TTL_SECONDS", "300"))
+
+# Seconds before a user's in-memory deadline buckets are reloaded from the database
+DEADLINE_RELOAD_SECONDS = float(os.getenv("DEADLINE_RELOAD_SECONDS", "300"))
+# Users whose deadline buckets are held per worker; the least recently read are dropped
+DEADLINE_MAX_USERS = int(os.getenv("DEADLINE_MAX_USERS", "10000"))
+
+# Task event stream: "memory" (single worker) or "postgres" (LISTEN/NOTIFY across workers)
+EVENT_BROKER = os.getenv("EVENT_BROKER", "memory").lower()
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+# Connections opened per pool (sync and async) during startup warm-up, and the cap on the
+# backoff between warm-up attempts while the database is unreachable
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", str(min(DB_POOL_SIZE, 5))))
+WARMUP_RETRY_MAX_SECONDS = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", "30"))
+# How long `python -m utils.migrations upgrade` keeps retrying an unreachable database before
+# giving up (same backoff cap as warm-up)
+MIGRATION_WAIT_SECONDS = float(os.getenv("MIGRATION_WAIT_SECONDS", "120"))
+
+# Monthly partitions (login_history) created ahead of time, and how often that is checked
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+PARTITION_MAINTENANCE_SECONDS = float(os.getenv("PARTITION_MAINTENANCE_SECONDS", "21600"))
+
+# Login-history write-behind buffer: events held in memory (extra ones are dropped and counted),
+# flushed every LOGIN_FLUSH_INTERVAL_SECONDS or once LOGIN_FLUSH_BATCH_SIZE are waiting;
+# batches of at least LOGIN_COPY_THRESHOLD events are written with COPY
+LOGIN_BUFFER_MAX_EVENTS = int(os.getenv("LOGIN_BUFFER_MAX_EVENTS", "10000"))
+LOGIN_FLUSH_BATCH_SIZE = int(os.getenv("LOGIN_FLUSH_BATCH_SIZE", "500"))
+LOGIN_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOGIN_FLUSH_INTERVAL_SECONDS", "1"))
+LOGIN_COPY_THRESHOLD = int(os.getenv("LOGIN_COPY_THRESHOLD", "2000"))
+
+# Raw login_history rows older than this many days are rolled up into per-user daily totals
+# and deleted, LOGIN_COMPACTION_BATCH_SIZE rows per transaction
+LOGIN_RAW_RETENTION_DAYS = int(os.getenv("LOGIN_RAW_RETENTION_DAYS", "90"))
+LOGIN_COMPACTION_BATCH_SIZE = int(os.getenv("LOGIN_COMPACTION_BATCH_SIZE", "10000"))
+LOGIN_COMPACTION_INTERVAL_SECONDS = float(os.getenv("LOGIN_COMPACTION_INTERVAL_SECONDS", "3600"))
+
+# Serialized task-read responses kept per worker (0 disables), and the window after which
+# time-dependent responses (derived 'Delayed', deadline buckets) are recomputed regardless
+TASK_RESPONSE_CACHE_SIZE = int(os.getenv("TASK_RESPONSE_CACHE_SIZE", "1000"))
+TASK_CACHE_TIME_BUCKET_SECONDS = float(os.getenv("TASK_CACHE_TIME_BUCKET_SECONDS", "60"))
+
+# Rows fetched per server-side cursor round trip when a list endpoint streams its result
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "1000"))
+
+# A SELECT repeated this many times within one request is reported as a likely N+1 pattern
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# On-demand profiling: percentage of requests sampled automatically (admins can also ask with the
+# X-Profile header), stack sampling interval, and where the newest PROFILE_KEEP profiles are stored
+PROFILE_SAMPLE_PERCENT = float(os.getenv("PROFILE_SAMPLE_PERCENT", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/task-manager-profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+# Per-user inverted indexes kept by the in-process task search fallback (non-Postgres databases)
+TASK_SEARCH_INDEX_USERS = int(os.getenv("TASK_SEARCH_INDEX_USERS", "1000"))
@@ -0,0 +1,55 @@
+import logging
+from typing import Any, AnyStr, Callable, Iterator, List, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from utils.database import SessionLocal
+from utils.serialization import dumps
+from utils.settings import STREAM_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+JSON_MEDIA_TYPE = "application/json"
+
+
+def stream_media_type(request: Request, stream: bool) -> Optional[str]:
+    # Opt-in: `Accept: application/x-ndjson` streams NDJSON, `?stream=1` alone streams a JSON array
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return NDJSON_MEDIA_TYPE
+    if stream:
+        return JSON_MEDIA_TYPE
+    return None
+
+def iter_row_batches(statement: Select, encode: Callable[[Any], AnyStr]) -> Iterator[List[AnyStr]]:
+    # The generator owns its session: request-scoped dependencies are closed before streaming starts.
+    # yield_per reads through a server-side cursor, so only one batch is held in memory at a time.
+    db = SessionLocal()
+    try:
+        result = db.execute(statement, execution_options={"yield_per": STREAM_BATCH_SIZE})
+        for batch in result.partitions():
+            yield [encode(row) for row in batch]
+    except Exception:
+        # Headers are already sent; the truncated body is all the client can be told
+        logger.exception("Streaming response failed")
+        raise
+    finally:
+        db.close()
+
+def iter_encoded_rows(statement: Select, to_dict: Callable, media_type: str) -> Iterator[bytes]:
+    batches = iter_row_batches(statement, lambda row: dumps(to_dict(row)))
+    if media_type == NDJSON_MEDIA_TYPE:
+        for batch in batches:
+            yield b"".join(line + b"\n" for line in batch)
+        return
+
+    separator = b"["
+    for batch in batches:
+        yield separator + b",".join(batch)
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
+def stream_rows(statement: Select, to_dict: Callable, media_type: str) -> StreamingResponse:
+    return StreamingResponse(iter_encoded_rows(statement, to_dict, media_type), media_type=media_type)
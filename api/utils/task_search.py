@@ -0,0 +1,194 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import func, literal, or_, text
+from sqlalchemy.orm import Session
+
+from utils.models import TS_CONFIG, Task, task_search_document
+from utils.settings import TASK_SEARCH_INDEX_USERS
+
+# Word-similarity threshold for trigram (typo tolerant) matches
+TRGM_THRESHOLD = 0.4
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(value: str) -> List[str]:
+    return _TOKEN_RE.findall(value.lower()) if value else []
+
+
+# ------------------- Postgres backend ------------------- #
+def _to_prefix_tsquery(terms: List[str]) -> str:
+    # Every term must match, the last one as a prefix so results follow the user's typing
+    parts = [f"{term}:*" if i == len(terms) - 1 else term for i, term in enumerate(terms)]
+    return " & ".join(parts)
+
+def _search_postgres(db: Session, user_id: int, q: str, limit: int, offset: int) -> List[Tuple[Task, float]]:
+    terms = tokenize(q)
+    tsquery = func.to_tsquery(TS_CONFIG, _to_prefix_tsquery(terms))
+    title_similarity = func.word_similarity(q, Task.title)
+    description_similarity = func.word_similarity(q, func.coalesce(Task.description, ""))
+    # Title terms carry weight A and description terms weight B in the document, so ts_rank puts
+    # title hits first; typo matches contribute through trigram similarity
+    score = (
+        func.ts_rank(task_search_document, tsquery)
+        + func.greatest(title_similarity, description_similarity * 0.5)
+    ).label("score")
+
+    db.execute(
+        text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+        {"t": str(TRGM_THRESHOLD)}
+    )
+    return (
+        db.query(Task, score)
+        .filter(
+            Task.user_id == user_id,
+            or_(
+                task_search_document.op("@@")(tsquery),
+                literal(q).op("<%")(Task.title),
+                literal(q).op("<%")(Task.description),
+            )
+        )
+        .order_by(score.desc(), Task.task_id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
+
+# ------------------- In-process fallback ------------------- #
+def _within_one_edit(a: str, b: str) -> bool:
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+            continue
+        i += 1
+        j += 1
+    return edits + (len(b) - j) <= 1
+
+
+class InvertedIndex:
+    """Token -> task_id postings for one user's tasks, with title hits weighted double."""
+
+    TITLE_WEIGHT = 2.0
+
+    def __init__(self, rows: List[Tuple[int, str, str]]):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        for task_id, title, description in rows:
+            for token in tokenize(title):
+                self.postings[token][task_id] = self.postings[token].get(task_id, 0) + self.TITLE_WEIGHT
+            for token in tokenize(description):
+                self.postings[token][task_id] = self.postings[token].get(task_id, 0) + 1.0
+        self.vocabulary = sorted(self.postings)
+        self.document_count = max(len(rows), 1)
+
+    def _expand(self, term: str, is_last: bool) -> List[Tuple[str, float]]:
+        # Exact match, then prefix completions (last term only), then single-edit typos
+        matches = []
+        if term in self.postings:
+            matches.append((term, 1.0))
+        if is_last:
+            i = bisect_left(self.vocabulary, term)
+            while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+                if self.vocabulary[i] != term:
+                    matches.append((self.vocabulary[i], 0.8))
+                i += 1
+        if not matches and len(term) >= 4:
+            matches.extend(
+                (token, 0.5) for token in self.vocabulary
+                if token[0] == term[0] and _within_one_edit(token, term)
+            )
+        return matches
+
+    def search(self, q: str) -> List[Tuple[int, float]]:
+        terms = tokenize(q)
+        scores: Dict[int, float] = {}
+        matched: Set[int] = set()
+        for position, term in enumerate(terms):
+            term_scores: Dict[int, float] = defaultdict(float)
+            for token, weight in self._expand(term, position == len(terms) - 1):
+                postings = self.postings[token]
+                idf = math.log(1 + self.document_count / len(postings))
+                for task_id, tf in postings.items():
+                    term_scores[task_id] += weight * tf * idf
+            # Every term has to match, as with the tsquery '&'
+            matched = set(term_scores) if position == 0 else matched & set(term_scores)
+            for task_id, value in term_scores.items():
+                scores[task_id] = scores.get(task_id, 0.0) + value
+        return sorted(((task_id, scores[task_id]) for task_id in matched), key=lambda hit: (-hit[1], hit[0]))
+
+
+class FallbackSearchIndex:
+    """
+    Per-user inverted indexes, built on first search and dropped when the user's tasks change.
+    At most `maxsize` users are kept; the least recently searched one is evicted first.
+    """
+
+    def __init__(self, maxsize: int = TASK_SEARCH_INDEX_USERS):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[int, InvertedIndex]" = OrderedDict()
+        # Bumped by invalidate(); an index built from rows read before an invalidation isn't kept
+        self._generation = 0
+
+    def get(self, db: Session, user_id: int) -> InvertedIndex:
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is not None:
+                self._indexes.move_to_end(user_id)
+                return index
+            generation = self._generation
+        rows = (
+            db.query(Task.task_id, Task.title, Task.description)
+            .filter(Task.user_id == user_id)
+            .all()
+        )
+        index = InvertedIndex(rows)
+        with self._lock:
+            if generation != self._generation:
+                return index
+            self._indexes[user_id] = index
+            while len(self._indexes) > self.maxsize:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._generation += 1
+            self._indexes.pop(user_id, None)
+
+
+fallback_index = FallbackSearchIndex()
+
+def _search_fallback(db: Session, user_id: int, q: str, limit: int, offset: int) -> List[Tuple[Task, float]]:
+    hits = fallback_index.get(db, user_id).search(q)[offset:offset + limit]
+    if not hits:
+        return []
+    tasks = {task.task_id: task for task in db.query(Task).filter(Task.task_id.in_([task_id for task_id, _ in hits]))}
+    return [(tasks[task_id], score) for task_id, score in hits if task_id in tasks]
+
+
+# ------------------- Entry points ------------------- #
+def search_tasks(db: Session, user_id: int, q: str, limit: int, offset: int = 0) -> List[Tuple[Task, float]]:
+    if not tokenize(q):
+        return []
+    if db.get_bind().dialect.name == "postgresql":
+        return _search_postgres(db, user_id, q, limit, offset)
+    return _search_fallback(db, user_id, q, limit, offset)
+
+# Called after every committed task write (see utils/data_version.py) and on user deletion
+def invalidate_task_search(user_id: int) -> None:
+    fallback_index.invalidate(user_id)
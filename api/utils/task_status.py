@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from typing import Optional
+from sqlalchemy import and_, case, update
+from sqlalchemy.orm import Session
+from utils.models import Task
+from utils.data_version import bump_user_versions
+
+# Tasks are stored in local time (UTC+7), matching created_at/finished_date
+LOCAL_TIMEZONE = timezone(timedelta(hours=7))
+
+def current_time() -> datetime:
+    return datetime.utcnow() + timedelta(hours=7)
+
+# ------------------- Effective status ------------------- #
+# An 'Ongoing' task whose due date has passed reads as 'Delayed'. The stored status
+# only changes on a real transition (complete/abandon) or through the sweep below,
+# so reads never write.
+def effective_status_id(ongoing_status_id: int, delayed_status_id: int, now: Optional[datetime] = None):
+    if now is None:
+        now = current_time()
+    return case(
+        (and_(Task.status_id == ongoing_status_id, Task.due_date < now), delayed_status_id),
+        else_=Task.status_id
+    )
+
+def is_overdue(task: Task, ongoing_status_id: int, now: Optional[datetime] = None) -> bool:
+    if now is None:
+        now = current_time()
+    return task.status_id == ongoing_status_id and task.due_date is not None and task.due_date < now
+
+# ------------------- Delayed sweep ------------------- #
+# One set-based UPDATE that persists 'Delayed' for every overdue 'Ongoing' task
+def sweep_delayed_tasks(db: Session, ongoing_status_id: int, delayed_status_id: int,
+                        now: Optional[datetime] = None) -> int:
+    if now is None:
+        now = current_time()
+    user_ids = db.execute(
+        update(Task)
+        .where(Task.status_id == ongoing_status_id, Task.due_date < now)
+        .values(status_id=delayed_status_id)
+        .returning(Task.user_id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+    bump_user_versions(db, user_ids)
+    db.commit()
+    return len(user_ids)
+
+# ------------------- Transitions ------------------- #
+# Shared by the single-task and bulk endpoints; raise the same HTTP errors either way.
+# `task` only needs status_id and due_date, so ORM rows and plain row tuples both work.
+def plan_complete(task, statuses, now: Optional[datetime] = None):
+    completed_status = statuses.find("Completed")
+    delayed_status = statuses.find("Delayed")
+    late_status = statuses.find("Late")
+    abandoned_status = statuses.find("Abandoned")
+    ongoing_status = statuses.find("Ongoing")
+
+    if not completed_status or not delayed_status or not late_status or not abandoned_status or not ongoing_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
+
+    if task.status_id == abandoned_status.status_id or task.status_id == late_status.status_id:
+        raise HTTPException(status_code=400, detail="Task with status 'Abandoned' cannot be completed")
+
+    # Completing a task after its due date records it as 'Late'
+    if task.status_id == delayed_status.status_id or is_overdue(task, ongoing_status.status_id, now):
+        return late_status
+    return completed_status
+
+def plan_abandon(task, statuses):
+    abandoned_status = statuses.find("Abandoned")
+    late_status = statuses.find("Late")
+    completed_status = statuses.find("Completed")
+
+    if not abandoned_status or not late_status or not completed_status:
+        raise HTTPException(status_code=404, detail="Required statuses not found")
+
+    if task.status_id == late_status.status_id or task.status_id == completed_status.status_id:
+        raise HTTPException(status_code=400, detail="Task cannot be abandoned because it is 'Late' or 'Completed'")
+
+    if task.status_id == abandoned_status.status_id:
+        raise HTTPException(status_code=400, detail="Task already 'Abandoned'")
+
+    return abandoned_status
@@ -0,0 +1,91 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from utils.database import SessionLocal, async_engine, engine
+from utils.events import event_broker
+from utils.lookups import lookup_registry
+from utils.settings import WARMUP_POOL_CONNECTIONS, WARMUP_RETRY_MAX_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    def __init__(self):
+        self.ready = False
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+
+    def as_dict(self) -> dict:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+            "elapsed_seconds": round(elapsed, 3),
+        }
+
+
+# ------------------- Steps ------------------- #
+def _open_sync_connections(count: int) -> None:
+    # Hold `count` connections at once so the pool really opens that many, then return them
+    connections = []
+    try:
+        for _ in range(count):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+
+async def _open_async_connections(count: int) -> None:
+    connections = []
+    try:
+        for _ in range(count):
+            connection = await async_engine.connect()
+            connections.append(connection)
+            await connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            await connection.close()
+
+def _prime_lookups() -> None:
+    db = SessionLocal()
+    try:
+        lookup_registry.get(db)
+    finally:
+        db.close()
+
+async def _warm_once() -> None:
+    await asyncio.to_thread(_open_sync_connections, WARMUP_POOL_CONNECTIONS)
+    await _open_async_connections(WARMUP_POOL_CONNECTIONS)
+    await asyncio.to_thread(_prime_lookups)
+    await event_broker.start()
+
+
+# Retries with exponential backoff, so a database that is briefly unreachable delays
+# readiness instead of failing the worker's boot
+async def warm_up(state: WarmupState) -> None:
+    delay = 0.5
+    while not state.ready:
+        state.attempts += 1
+        try:
+            await _warm_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            state.last_error = f"{type(e).__name__}: {e}"
+            logger.warning("Warm-up attempt %s failed (%s); retrying in %.1fs", state.attempts, state.last_error, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+            continue
+        state.ready = True
+        state.last_error = None
+        state.finished_at = time.monotonic()
+        logger.info("Warm-up finished after %s attempt(s)", state.attempts)
@@ -22,6 +22,7 @@ function UsersTable() {
   const [reverseStatus, setReverseStatus] = useState(false); // Reverse sorting status
   const [userToDelete, setUserToDelete] = useState(null);  // Store user_id of the user to delete
   const [openDialog, setOpenDialog] = useState(false);  // Control the display of the MUI Dialog
+  const [nextCursor, setNextCursor] = useState(null);  // Cursor of the next page, if any
 
   const router = useRouter();  // Initialize useRouter to handle redirects
 
@@ -35,8 +36,9 @@ function UsersTable() {
     }
   }, []);
 
-  // Function to fetch users based on username, with sorting and reverse status
-  const fetchUsers = async (username = '') => {
+  // Function to fetch users based on username, with sorting and reverse status.
+  // Users come a page at a time; passing the cursor of the last page appends the next one.
+  const fetchUsers = async (username = '', after = null) => {
     setLoading(true);
     setError(null); // Clear error before new request
     try {
@@ -45,9 +47,11 @@ function UsersTable() {
           username: username, // Search by username if provided
           sorting_status: sortingStatus, // Sorting status
           reverse_status: reverseStatus, // Reverse sorting status
+          ...(after ? { after } : {}),
         },
       });
-      setUsers(response.data);  // Set users in state
+      setUsers(after ? [...users, ...response.data] : response.data);  // Set users in state
+      setNextCursor(response.headers['x-next-cursor'] || null);
       setLoading(false);
     } catch (err) {
       setError(err);  // Set error message from the backend
@@ -179,6 +183,12 @@ function UsersTable() {
           !loading && !error && <p className={styles.noUsers}>No users found.</p>
         )}
 
+        {!loading && !error && nextCursor && (
+          <button type="button" onClick={() => fetchUsers(searchUsername, nextCursor)} className={styles.showAllButton}>
+            Load More
+          </button>
+        )}
+
         {/* MUI Dialog for confirming deletion */}
         <Dialog
           open={openDialog}
@@ -66,7 +66,7 @@ function Dashboard() {
     );
   }
 
-  if (!dashboardData || !dashboardData.tasks || !dashboardData.category_counts || !dashboardData.priority_counts || !dashboardData.status_counts) {
+  if (!dashboardData || !dashboardData.category_counts || !dashboardData.priority_counts || !dashboardData.status_counts) {
     return (
       <Box display="flex" justifyContent="center" alignItems="center" minHeight="100vh">
         <Typography variant="h6" color="error">
@@ -77,13 +77,9 @@ function Dashboard() {
   }
 
   // Defensive checks to avoid undefined length error
-  const totalTasks = dashboardData.tasks ? dashboardData.tasks.length : 0;
-  const completedTasks = dashboardData.tasks
-    ? dashboardData.tasks.filter(task => task.status === 'Completed').length
-    : 0;
-  const missingTasks = dashboardData.tasks
-  ? dashboardData.tasks.filter(task => task.status === 'Delayed').length
-  : 0;
+  const totalTasks = dashboardData.total_tasks || 0;
+  const completedTasks = dashboardData.status_counts.Completed || 0;
+  const missingTasks = dashboardData.status_counts.Delayed || 0;
 
   // Data for charts (with default empty arrays if undefined)
   const categoryData = dashboardData.category_counts
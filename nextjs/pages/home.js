@@ -66,14 +66,18 @@ function Home() {
 
         const data = response.data;
 
+        // Remaining times are computed here from due_date, and refreshed every second below
         const oneDayTasks = data.oneday_left.map(task => ({
           ...task,
           due_date: new Date(task.due_date),
+          time_remain: getTimeRemaining(new Date(task.due_date)),
         }));
 
         const oneWeekTasks = data.oneweek_left.map(task => ({
           ...task,
           due_date: new Date(task.due_date),
+          time_remain: getTimeRemaining(new Date(task.due_date)),
+          day_remain: getDaysRemaining(new Date(task.due_date)),
         }));
 
         setOneDayLeftTasks(oneDayTasks);
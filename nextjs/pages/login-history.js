@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react';
 import {
   Box,
+  Button,
   Typography,
   CircularProgress,
   Paper,
@@ -27,28 +28,38 @@ import withAuth from '@/hoc/withAuth';
 const LoginHistoryPage = () => {
   const [loginHistory, setLoginHistory] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);  // Cursor of the next page, if any
+  const [start] = useState(() => new Date(Date.now() - 365 * 24 * 60 * 60 * 1000).toISOString());
   const theme = useTheme();
 
+  // Last year of logins, newest first, a page at a time; passing the cursor of the last page appends the next one.
+  const fetchLoginHistory = async (after = null) => {
+    setLoadingMore(true);
+    try {
+      const params = new URLSearchParams({ start, limit: '500' });
+      if (after) params.set('after', after);
+      const response = await fetch(`http://localhost:8000/data/login-history/?${params}`);
+      if (!response.ok) {
+        throw new Error('Failed to fetch login history data');
+      }
+      const data = await response.json();
+      setLoginHistory((previous) => (after ? [...previous, ...data] : data));
+      setNextCursor(response.headers.get('X-Next-Cursor'));
+    } catch (error) {
+      console.error('Error fetching login history:', error);
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     const isAdmin = localStorage.getItem('is_admin') === 'true';
 
     if (!isAdmin) {
       router.push('/home'); // Redirect to home if not admin
     }
-    const fetchLoginHistory = async () => {
-      try {
-        const response = await fetch(`http://localhost:8000/data/login-history`);
-        if (!response.ok) {
-          throw new Error('Failed to fetch login history data');
-        }
-        const data = await response.json();
-        setLoginHistory(data);
-      } catch (error) {
-        console.error('Error fetching login history:', error);
-      } finally {
-        setLoading(false);
-      }
-    };
     fetchLoginHistory();
   }, []);
 
@@ -146,6 +157,13 @@ const LoginHistoryPage = () => {
                 </TableBody>
               </Table>
             </TableContainer>
+            {nextCursor && (
+              <Box sx={{ display: 'flex', justifyContent: 'center', marginTop: 2 }}>
+                <Button variant="outlined" disabled={loadingMore} onClick={() => fetchLoginHistory(nextCursor)}>
+                  Load More
+                </Button>
+              </Box>
+            )}
           </Paper>
 
           {/* Dashboard Rendering */}